@@ -0,0 +1,186 @@
+'''
+Batch Mode
+
+Runs a script of editor commands (one command per line, exactly as typed at the
+prompt) on files without the interactive prompt and without displaying
+anything in between. The result is written once at the end, and the number of
+commands per second is reported.
+
+Usage:
+    python batch.py SCRIPT [FILE] [-o OUTPUT | --in-place]
+    python batch.py SCRIPT FILE FILE... (-d DIRECTORY | --in-place) [-j JOBS]
+
+SCRIPT may be '-' to read the commands from standard input. With one file and
+without -o or --in-place, the result is written to standard output. With
+several files, every file is edited in its own session by a pool of worker
+processes, and the outcome and timing of every file is reported.
+'''
+
+# import library
+import argparse
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from session import Session
+from fileio import ENCODING, ERRORS, save_file
+
+# outcome of running the script on one file
+FileResult = namedtuple('FileResult', ['path', 'ok', 'error', 'commands', 'seconds'])
+
+def read_commands(script) -> list:
+    '''
+    Returns the commands of a script, one per line.
+    Only the line breaks are removed, since spaces can be part of a command.
+
+    Args:
+        script (file)   : The opened script.
+    '''
+    return [line.rstrip('\r\n') for line in script]
+
+def run_commands(session:Session, commands:list) -> int:
+    '''
+    Runs the commands on the document of a session, stopping at the quit command.
+    Returns the number of commands that were run.
+
+    Args:
+        session (Session)   : The session holding the document.
+        commands (list)     : The commands, as typed at the prompt.
+    '''
+    count = 0
+    for command in commands:
+        count += 1
+        if not session.run(command):
+            break
+    return count
+
+def write_lines(buffer, output) -> None:
+    '''
+    Writes the document to a binary stream, line by line.
+
+    Args:
+        buffer (LineBuffer) : The document.
+        output (file)       : The binary stream to write to.
+    '''
+    for index, line in enumerate(buffer.lines()):
+        output.write(('\n'+line if index else line).encode(ENCODING, ERRORS))
+    output.flush()
+
+def process_file(path:str, output:str, commands:list) -> FileResult:
+    '''
+    Runs the commands on one file in a new session and writes the result.
+    Errors are reported in the result instead of being raised, so one file cannot stop the others.
+
+    Args:
+        path (str)      : The file to edit.
+        output (str)    : The file to write the result to.
+        commands (list) : The commands, as typed at the prompt.
+    '''
+    start = time.perf_counter()
+    try:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f'No such file: {path}')
+        session = Session(quiet=True)
+        session.open_document(path)
+        count = run_commands(session, commands)
+        save_file(session.buffer, output)
+    except Exception as error:
+        return FileResult(path, False, f'{type(error).__name__}: {error}', 0, time.perf_counter()-start)
+    return FileResult(path, True, '', count, time.perf_counter()-start)
+
+def process_files(paths:list, outputs:list, commands:list, jobs:int=None) -> list:
+    '''
+    Runs the commands on many files in parallel, each file in its own session.
+    Returns the result of every file, in the order of the paths.
+
+    Args:
+        paths (list)    : The files to edit.
+        outputs (list)  : The file to write the result of each file to.
+        commands (list) : The commands, as typed at the prompt.
+        jobs (int)      : The number of worker processes (default: the number of processors).
+    '''
+    jobs = jobs or os.cpu_count() or 1
+    chunksize = max(1, len(paths)//(jobs*4))    # fewer round trips for thousands of small files
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(process_file, paths, outputs, repeat(commands), chunksize=chunksize))
+
+def main(argv:list=None) -> int:
+    '''
+    Runs a script of commands from the command line.
+    Returns the exit status of the program.
+
+    Args:
+        argv (list) : The command line arguments (default: sys.argv[1:]).
+    '''
+    parser = argparse.ArgumentParser(description='Run editor commands on files without the prompt.')
+    parser.add_argument('script', help="file with one command per line ('-' for standard input)")
+    parser.add_argument('files', nargs='*', metavar='FILE', help='files to edit (default: an empty document)')
+    destination = parser.add_mutually_exclusive_group()
+    destination.add_argument('-o', '--output', help='file to write the result to (one FILE only)')
+    destination.add_argument('-d', '--output-dir', help='directory to write the results to, under the names of the files')
+    destination.add_argument('--in-place', action='store_true', help='write the results back to the files')
+    parser.add_argument('-j', '--jobs', type=int, help='number of worker processes (default: the number of processors)')
+    args = parser.parse_args(argv)
+    if args.in_place and not args.files:
+        parser.error('--in-place requires FILE')
+    if len(args.files) > 1 and not (args.in_place or args.output_dir):
+        parser.error('several files require --output-dir or --in-place')
+    if args.output and len(args.files) > 1:
+        parser.error('-o accepts one FILE only, use --output-dir')
+
+    try:
+        if args.script == '-':
+            commands = read_commands(sys.stdin)
+        else:
+            with open(args.script, encoding='utf-8') as script:
+                commands = read_commands(script)
+    except OSError as error:
+        print(error, file=sys.stderr)
+        return 1
+
+    if args.in_place or args.output_dir:
+        outputs = args.files if args.in_place else [os.path.join(args.output_dir, os.path.basename(path)) for path in args.files]
+        if len(set(outputs)) != len(outputs):
+            parser.error('several files would be written to the same output')
+        start = time.perf_counter()
+        if len(args.files) == 1:
+            results = [process_file(args.files[0], outputs[0], commands)]
+        else:
+            results = process_files(args.files, outputs, commands, args.jobs)
+        elapsed = time.perf_counter()-start
+        for result in results:
+            if result.ok:
+                print(f'{result.path}: {result.commands} commands in {result.seconds:.3f} s', file=sys.stderr)
+            else:
+                print(f'{result.path}: failed: {result.error}', file=sys.stderr)
+        count = sum(result.commands for result in results)
+        succeeded = sum(result.ok for result in results)
+        print(f'{succeeded}/{len(results)} files, {count} commands in {elapsed:.3f} s '
+              f'({count/elapsed if elapsed else 0:.0f} commands/s)', file=sys.stderr)
+        return 0 if succeeded == len(results) else 1
+
+    session = Session(quiet=True)
+    try:
+        if args.files:
+            if not os.path.exists(args.files[0]):
+                raise FileNotFoundError(f'No such file: {args.files[0]}')
+            session.open_document(args.files[0])
+
+        start = time.perf_counter()
+        count = run_commands(session, commands)
+        elapsed = time.perf_counter()-start
+
+        if args.output:
+            save_file(session.buffer, args.output)
+        else:
+            write_lines(session.buffer, sys.stdout.buffer)
+    except OSError as error:
+        print(error, file=sys.stderr)
+        return 1
+    print(f'{count} commands in {elapsed:.3f} s ({count/elapsed if elapsed else 0:.0f} commands/s)', file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
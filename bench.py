@@ -0,0 +1,255 @@
+'''
+Benchmark
+
+Times every editing command on synthetic documents of increasing size, from
+1 KB to 100 MB, with varied line lengths and word densities. The documents are
+generated from a seed, so two runs with the same options edit the same text at
+the same positions. For every size and command, the latency percentiles and
+the peak memory allocated while the command runs (measured with tracemalloc in
+a separate pass, so tracing does not slow the timed pass) are reported and
+saved as JSON, so that the results of two versions can be compared.
+
+Usage:
+    python bench.py [--sizes 1KB,1MB,...] [-n SAMPLES] [--seed SEED] [-o RESULTS] [--compare BASELINE]
+'''
+
+# import library
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from session import Session
+
+# commands timed, with the commands run before every sample so that the timed command has something to do
+COMMANDS = {'h': [], 'l': [], 'j': [], 'k': [], '^': [], '$': [],
+            'w': [], 'b': [], 'x': [], 'dw': [],
+            'ibenchmark ': [], 'a benchmark': [],
+            'yy': [], 'p': ['yy'], 'P': ['yy'], 'dd': [], 'o': [], 'O': [],
+            'u': ['x'], 'U': ['x', 'u'], 'r': ['x']}
+SIZES = '1KB,10KB,100KB,1MB,10MB,100MB'
+UNITS = {'KB': 1 << 10, 'MB': 1 << 20, 'GB': 1 << 30, 'B': 1}
+WORDS = ['a', 'an', 'the', 'edit', 'line', 'cursor', 'buffer', 'benchmark', 'document', 'x'*20]
+
+def parse_size(size:str) -> int:
+    '''
+    Returns the number of bytes of a size such as '10KB' or '1MB'.
+
+    Args:
+        size (str)  : The size, with an optional unit.
+    '''
+    size = size.strip().upper()
+    for unit, factor in UNITS.items():
+        if size.endswith(unit):
+            return int(float(size[:-len(unit)])*factor)
+    return int(size)
+
+def generate_line(rng:random.Random) -> str:
+    '''
+    Returns a random line: empty, a few words, or a long line of dense or sparse words.
+
+    Args:
+        rng (Random)    : The random number generator.
+    '''
+    length = rng.choice([0, 1, 5, 10, 20, 50, 200])
+    spaces = rng.choice([' ', ' ', ' ', '  ', '    '])    # word density
+    return spaces.join(rng.choice(WORDS) for _ in range(length))
+
+def generate_document(path:str, size:int, seed:int) -> None:
+    '''
+    Writes a document of about the given size to a file.
+    Lines are drawn from a pool of random lines so that even 100 MB are generated quickly.
+
+    Args:
+        path (str)  : The path of the file.
+        size (int)  : The number of bytes to write.
+        seed (int)  : The seed of the random number generator.
+    '''
+    rng = random.Random(seed)
+    pool = [generate_line(rng).encode() for _ in range(4096)]
+    written = 0
+    with open(path, 'wb') as file:
+        while written < size:
+            chunk = b'\n'.join(rng.choices(pool, k=1024))+b'\n'
+            chunk = chunk[:size-written]
+            file.write(chunk)
+            written += len(chunk)
+
+def place_cursor(session:Session, rng:random.Random) -> None:
+    '''
+    Moves the cursors of a session to a random position of the document.
+
+    Args:
+        session (Session)   : The session.
+        rng (Random)        : The random number generator.
+    '''
+    session.line_curs_pos = rng.randrange(session.buffer.line_count())
+    session.row_curs_pos = rng.randrange(len(session.buffer.get_line(session.line_curs_pos))+1)
+
+def percentile(samples:list, fraction:float) -> float:
+    '''
+    Returns a percentile of sorted samples, by the nearest rank.
+
+    Args:
+        samples (list)      : The sorted samples.
+        fraction (float)    : The percentile, between 0 and 1.
+    '''
+    return samples[min(len(samples)-1, int(fraction*len(samples)))]
+
+def time_command(path:str, command:str, samples:int, seed:int) -> dict:
+    '''
+    Returns the latency statistics of a command, in microseconds.
+
+    Args:
+        path (str)      : The document the command runs on.
+        command (str)   : The command, as typed at the prompt.
+        samples (int)   : The number of times the command runs.
+        seed (int)      : The seed of the cursor positions.
+    '''
+    rng = random.Random(seed)
+    session = Session(quiet=True)
+    session.open_document(path)
+    latencies = []
+    for _ in range(samples):
+        place_cursor(session, rng)
+        for setup in COMMANDS[command]:
+            session.run(setup)
+        start = time.perf_counter_ns()
+        session.run(command)
+        latencies.append((time.perf_counter_ns()-start)/1000)
+    latencies.sort()
+    return {'p50_us': percentile(latencies, 0.5), 'p90_us': percentile(latencies, 0.9),
+            'p99_us': percentile(latencies, 0.99), 'max_us': latencies[-1],
+            'mean_us': sum(latencies)/len(latencies)}
+
+def trace_command(path:str, command:str, samples:int, seed:int) -> int:
+    '''
+    Returns the largest amount of memory, in bytes, allocated while the command runs.
+
+    Args:
+        path (str)      : The document the command runs on.
+        command (str)   : The command, as typed at the prompt.
+        samples (int)   : The number of times the command runs.
+        seed (int)      : The seed of the cursor positions.
+    '''
+    rng = random.Random(seed)
+    session = Session(quiet=True)
+    session.open_document(path)
+    peak = 0
+    tracemalloc.start()
+    try:
+        for _ in range(samples):
+            place_cursor(session, rng)
+            for setup in COMMANDS[command]:
+                session.run(setup)
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            session.run(command)
+            peak = max(peak, tracemalloc.get_traced_memory()[1]-before)
+    finally:
+        tracemalloc.stop()
+    return peak
+
+def trace_open(path:str) -> tuple:
+    '''
+    Returns the time in seconds and the peak memory in bytes taken to open a document, and its number of lines.
+
+    Args:
+        path (str)  : The document.
+    '''
+    session = Session(quiet=True)
+    start = time.perf_counter()
+    session.open_document(path)
+    seconds = time.perf_counter()-start
+    tracemalloc.start()
+    try:
+        Session(quiet=True).open_document(path)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return seconds, peak, session.buffer.line_count()
+
+def run_benchmark(sizes:list, samples:int, seed:int, commands:list=None, log=sys.stderr) -> dict:
+    '''
+    Runs the benchmark and returns its results.
+
+    Args:
+        sizes (list)    : The sizes of the documents, in bytes.
+        samples (int)   : The number of times every command runs on every document.
+        seed (int)      : The seed of the documents and cursor positions.
+        commands (list) : The commands to time (default: every command of COMMANDS).
+        log (file)      : The stream progress is reported to.
+    '''
+    commands = commands or list(COMMANDS)
+    results = {'python': platform.python_version(), 'platform': platform.platform(),
+               'seed': seed, 'samples': samples, 'documents': []}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = os.path.join(directory, f'{size}.txt')
+            generate_document(path, size, seed)
+            seconds, peak, line_count = trace_open(path)
+            document = {'size': size, 'lines': line_count, 'open_s': seconds, 'open_peak_bytes': peak, 'commands': {}}
+            for command in commands:
+                stats = time_command(path, command, samples, seed)
+                stats['peak_bytes'] = trace_command(path, command, max(1, samples//10), seed)
+                document['commands'][command] = stats
+                print(f'{size:>11} B  {command:<12} p50 {stats["p50_us"]:10.1f} us  p99 {stats["p99_us"]:10.1f} us  '
+                      f'peak {stats["peak_bytes"]:>10} B', file=log)
+            results['documents'].append(document)
+    return results
+
+def compare(results:dict, baseline:dict, log=sys.stderr) -> None:
+    '''
+    Reports how the median latency of every command changed since a baseline.
+
+    Args:
+        results (dict)  : The results of this run.
+        baseline (dict) : The results of an earlier run.
+        log (file)      : The stream the comparison is written to.
+    '''
+    previous = {document['size']: document['commands'] for document in baseline['documents']}
+    for document in results['documents']:
+        for command, stats in document['commands'].items():
+            old = previous.get(document['size'], {}).get(command)
+            if old and old['p50_us']:
+                print(f'{document["size"]:>11} B  {command:<12} p50 {old["p50_us"]:10.1f} -> {stats["p50_us"]:10.1f} us '
+                      f'({stats["p50_us"]/old["p50_us"]:.2f}x)', file=log)
+
+def main(argv:list=None) -> int:
+    '''
+    Runs the benchmark from the command line.
+    Returns the exit status of the program.
+
+    Args:
+        argv (list) : The command line arguments (default: sys.argv[1:]).
+    '''
+    parser = argparse.ArgumentParser(description='Time every editor command on documents of increasing size.')
+    parser.add_argument('--sizes', default=SIZES, help=f'comma-separated document sizes (default: {SIZES})')
+    parser.add_argument('-n', '--samples', type=int, default=200, help='runs of every command on every document (default: 200)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the documents and cursor positions (default: 0)')
+    parser.add_argument('-c', '--commands', help='comma-separated commands to time (default: all)')
+    parser.add_argument('-o', '--output', help='file to save the results to, as JSON (default: standard output)')
+    parser.add_argument('--compare', metavar='BASELINE', help='results of an earlier run to compare with')
+    args = parser.parse_args(argv)
+    commands = args.commands.split(',') if args.commands else None
+    if commands and not set(commands) <= set(COMMANDS):
+        parser.error(f'unknown commands: {", ".join(sorted(set(commands)-set(COMMANDS)))}')
+
+    results = run_benchmark([parse_size(size) for size in args.sizes.split(',')], args.samples, args.seed, commands)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=1)
+    else:
+        json.dump(results, sys.stdout, indent=1)
+        print()
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            compare(results, json.load(file))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,448 @@
+'''
+Line Buffer
+
+Stores the document of the text editor as a list of blocks, where every block
+holds a bounded number of lines. Reading or editing one line only touches the
+block that contains it, so a single-line edit costs O(line length) instead of
+splitting and re-joining the whole document on every command.
+
+Lines that come from a file are kept as spans of the file until they are
+edited, so opening a large file does not read all of its lines. Large groups
+of lines inserted at once are packed into one block of bytes with an index of
+where every line starts, and are decoded only when they are read, which takes
+a few times less memory than a list of str for short lines.
+'''
+
+# import library
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+
+# maximum number of lines kept in one block before it is split
+BLOCK_SIZE = 512
+# minimum number of inserted lines that are packed instead of kept as str
+PACK_SIZE = 4*BLOCK_SIZE
+ENCODING = 'utf-8'
+ERRORS = 'surrogateescape'  # keeps undecodable bytes intact when the file is saved again
+
+class Span:
+    '''
+    A range of lines of a source (such as a file) that are read only when needed.
+    The source must provide get_line(index) and get_lines(start, stop).
+
+    Args:
+        source (object) : The source holding the lines.
+        start (int)     : The index of the first line in the source.
+        count (int)     : The number of lines.
+    '''
+    __slots__ = ('source', 'start', 'count')
+
+    def __init__(self, source, start:int, count:int):
+        self.source = source
+        self.start = start
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, _ = index.indices(self.count)
+            return self.source.get_lines(self.start+start, self.start+max(start, stop))
+        if not 0 <= index < self.count:
+            raise IndexError('line index out of range')
+        return self.source.get_line(self.start+index)
+
+    def cut(self, start:int, stop:int) -> list:
+        '''
+        Returns the spans that remain once the lines between "start" and "stop" are removed.
+
+        Args:
+            start (int), stop (int) : The range of removed lines, relative to the span.
+        '''
+        remaining = [Span(self.source, self.start, start),
+                     Span(self.source, self.start+stop, self.count-stop)]
+        return [span for span in remaining if span.count]
+
+class PackedLines:
+    '''
+    Lines stored as their encoded bytes, separated by line breaks, with the position where every line starts.
+    Use pack() to build it.
+
+    Args:
+        data (bytes)    : The encoded lines, separated by line breaks.
+        offsets (array) : The position of the first byte of every line, followed by the size of the data plus one.
+    '''
+    __slots__ = ('data', 'offsets')
+
+    def __init__(self, data:bytes, offsets:array):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def pack(cls, lines:list):
+        '''
+        Returns the lines packed, or None if a line cannot be encoded.
+
+        Args:
+            lines (list)    : The lines to pack.
+        '''
+        text = '\n'.join(lines)
+        try:
+            data = text.encode(ENCODING, ERRORS)
+        except UnicodeEncodeError:
+            return None
+        if len(data) == len(text):  # one byte per character
+            sizes = map(len, lines)
+        else:
+            sizes = (len(line.encode(ENCODING, ERRORS)) for line in lines)
+        offsets = array('I' if len(data) < 1 << 32 else 'Q', [0])
+        offsets.extend(accumulate(size+1 for size in sizes))
+        return cls(data, offsets)
+
+    def line_count(self) -> int:
+        '''
+        Returns the number of packed lines.
+        '''
+        return len(self.offsets)-1
+
+    def get_line(self, index:int) -> str:
+        '''
+        Returns the line at the given index.
+
+        Args:
+            index (int) : The index of the line.
+        '''
+        return self.data[self.offsets[index]:self.offsets[index+1]-1].decode(ENCODING, ERRORS)
+
+    def get_lines(self, start:int, stop:int) -> list:
+        '''
+        Returns the lines between "start" and "stop".
+
+        Args:
+            start (int), stop (int) : The range of line indices.
+        '''
+        if start >= stop:
+            return []
+        lines = self.data[self.offsets[start]:self.offsets[stop]-1].decode(ENCODING, ERRORS).split('\n')
+        if len(lines) != stop-start:    # some lines contain line breaks
+            lines = [self.get_line(index) for index in range(start, stop)]
+        return lines
+
+    def write_raw(self, file, start:int, stop:int) -> None:
+        '''
+        Writes the bytes of the lines between "start" and "stop" to a file.
+
+        Args:
+            file (file)             : The binary file to write to.
+            start (int), stop (int) : The range of line indices.
+        '''
+        file.write(memoryview(self.data)[self.offsets[start]:self.offsets[stop]-1])
+
+class LineBuffer:
+    '''
+    A document stored as blocks of lines.
+
+    Args:
+        content (str)   : The initial text of the document (default: '').
+    '''
+    def __init__(self, content:str=''):
+        self._blocks = []   # lists of lines or spans of a source
+        self._starts = []   # index of the first line of every block
+        self._count = 0     # number of lines
+        self.passes = 0     # number of times the whole document was read
+        self.version = 0    # number of edits made to the document
+        self.insert(0, content.split('\n'))
+
+    @classmethod
+    def from_source(cls, source):
+        '''
+        Returns a buffer holding every line of a source without reading them.
+        The source must also provide line_count().
+
+        Args:
+            source (object) : The source holding the lines.
+        '''
+        return cls.from_blocks([Span(source, 0, source.line_count())])
+
+    @classmethod
+    def from_blocks(cls, blocks:list):
+        '''
+        Returns a buffer made of the given blocks, which it takes ownership of.
+
+        Args:
+            blocks (list)   : The blocks: lists of lines or spans of a source.
+        '''
+        buffer = cls.__new__(cls)
+        buffer._blocks = [block for block in blocks if len(block)]
+        buffer._starts = []
+        buffer.passes = buffer.version = 0
+        buffer._reindex(0)
+        return buffer
+
+    def __len__(self) -> int:
+        return self._count
+
+    def line_count(self) -> int:
+        '''
+        Returns the number of lines in the document.
+        '''
+        return self._count
+
+    def memory(self) -> int:
+        '''
+        Returns the number of characters of the lines held in memory.
+        The lines still read from a file are not counted, and packed lines count their bytes.
+        '''
+        size = 0
+        for block in self._blocks:
+            if isinstance(block, list):
+                size += sum(map(len, block))
+            elif isinstance(block.source, PackedLines):
+                size += block.source.offsets[block.start+block.count]-block.source.offsets[block.start]
+        return size
+
+    def get_line(self, index:int) -> str:
+        '''
+        Returns the line at the given index.
+
+        Args:
+            index (int) : The index of the line.
+        '''
+        block, offset = self._locate(index)
+        return self._blocks[block][offset]
+
+    def set_line(self, index:int, line:str) -> None:
+        '''
+        Replaces the line at the given index.
+
+        Args:
+            index (int) : The index of the line.
+            line (str)  : The new content of the line.
+        '''
+        block, offset = self._materialize(*self._locate(index))
+        self._blocks[block][offset] = line
+        self.version += 1
+
+    def load_line(self, index:int) -> str:
+        '''
+        Returns the line at the given index, read into memory first when it is still in a span,
+        so reading it again does not decode it. The document does not change, so neither does its version.
+
+        Args:
+            index (int) : The index of the line.
+        '''
+        block, offset = self._materialize(*self._locate(index))
+        return self._blocks[block][offset]
+
+    def insert(self, index:int, lines:list) -> None:
+        '''
+        Inserts lines before the line at the given index.
+        An index equal to the number of lines appends the lines at the end.
+        The lines of another buffer are inserted as its blocks, without reading them.
+
+        Args:
+            index (int)     : The index where the lines are inserted.
+            lines (list)    : The lines to insert, or a LineBuffer holding them.
+        '''
+        if not 0 <= index <= self._count:
+            raise IndexError('line index out of range')
+        if not lines:
+            return
+        self.version += 1
+        if isinstance(lines, LineBuffer):   # the lists of lines are copied so that no block is shared
+            block = self._split(index)
+            self._blocks[block:block] = [part[:] if isinstance(part, list) else part for part in lines._blocks]
+            self._reindex(block)
+            return
+        packed = PackedLines.pack(lines) if len(lines) >= PACK_SIZE else None
+        if packed:
+            block = self._split(index)
+            self._blocks[block:block] = [Span(packed, 0, len(lines))]
+            self._reindex(block)
+            return
+        if not self._blocks or not isinstance(self._blocks[-1], list) and index == self._count:
+            self._blocks.append([])
+            self._reindex(len(self._blocks)-1)
+        if index == self._count:    # append to the last block
+            block = len(self._blocks)-1
+            offset = len(self._blocks[block])
+        else:
+            block, offset = self._materialize(*self._locate(index))
+        self._blocks[block][offset:offset] = lines
+        if len(self._blocks[block]) > 2*BLOCK_SIZE:     # split oversized block
+            lines = self._blocks[block]
+            self._blocks[block:block+1] = [lines[i:i+BLOCK_SIZE] for i in range(0, len(lines), BLOCK_SIZE)]
+        self._reindex(block)
+
+    def delete(self, index:int, count:int=1):
+        '''
+        Deletes a number of lines starting at the given index.
+        Returns the deleted lines as a LineBuffer holding the removed blocks, so the
+        lines that were not read yet are not read to be deleted.
+
+        Args:
+            index (int) : The index of the first deleted line.
+            count (int) : The number of lines to delete (default: 1).
+        '''
+        if count <= 0:
+            return LineBuffer.from_blocks([])
+        if not 0 <= index or index+count > self._count:
+            raise IndexError('line index out of range')
+        first, offset = self._locate(index)
+        self.version += 1
+        deleted = []
+        block = first
+        while count > 0:
+            lines = self._blocks[block]
+            removed = min(count, len(lines)-offset)
+            count -= removed
+            if removed == len(lines):   # the whole block is moved out
+                deleted.append(lines)
+                remaining = []
+            elif isinstance(lines, list):
+                deleted.append(lines[offset:offset+removed])
+                del lines[offset:offset+removed]
+                remaining = [lines]
+            else:   # spans are cut without reading the lines they keep or remove
+                deleted.append(Span(lines.source, lines.start+offset, removed))
+                remaining = lines.cut(offset, offset+removed)
+            self._blocks[block:block+1] = remaining
+            block += len(remaining)
+            offset = 0
+        # merge small neighbouring blocks around the deletion
+        for block in (first, first-1):
+            if 0 <= block < len(self._blocks)-1 and isinstance(self._blocks[block], list) and \
+               isinstance(self._blocks[block+1], list) and len(self._blocks[block])+len(self._blocks[block+1]) <= BLOCK_SIZE:
+                self._blocks[block:block+2] = [self._blocks[block]+self._blocks[block+1]]
+        self._reindex(max(0, first-1))
+        return LineBuffer.from_blocks(deleted)
+
+    def snapshot(self, start:int=0, stop:int=None):
+        '''
+        Returns a copy of the buffer, or of a range of its lines, that later edits of the buffer do not change.
+        The lines and spans are shared; only the lists of lines of the blocks are copied.
+
+        Args:
+            start (int), stop (int) : The range of line indices (default: the whole document).
+        '''
+        stop = self._count if stop is None else min(stop, self._count)
+        if start == 0 and stop == self._count:
+            copy = LineBuffer.__new__(LineBuffer)
+            copy._blocks = [block[:] if isinstance(block, list) else block for block in self._blocks]
+            copy._starts = self._starts[:]
+            copy._count = self._count
+            copy.passes, copy.version = 0, self.version
+            return copy
+        blocks = []
+        if start < stop:
+            first, offset = self._locate(start)
+            last, end = self._locate(stop-1)
+            for block in range(first, last+1):
+                lines = self._blocks[block]
+                begin, finish = offset if block == first else 0, end+1 if block == last else len(lines)
+                blocks.append(lines[begin:finish] if isinstance(lines, list) else Span(lines.source, lines.start+begin, finish-begin))
+        copy = LineBuffer.from_blocks(blocks)
+        copy.version = self.version
+        return copy
+
+    def lines(self, start:int=0, stop:int=None):
+        '''
+        Yields the lines between "start" and "stop" in order.
+
+        Args:
+            start (int), stop (int) : The range of line indices (default: the whole document).
+        '''
+        stop = self._count if stop is None else min(stop, self._count)
+        if start >= stop:
+            return
+        if start == 0 and stop == self._count:
+            self.passes += 1
+        block, offset = self._locate(start)
+        remaining = stop-start
+        while remaining > 0:
+            chunk = self._blocks[block][offset:offset+min(remaining, BLOCK_SIZE)]
+            yield from chunk
+            remaining -= len(chunk)
+            offset += len(chunk)
+            if offset == len(self._blocks[block]):
+                block, offset = block+1, 0
+
+    def blocks(self):
+        '''
+        Yields the blocks of the document in order: lists of lines, or spans of a source.
+        '''
+        self.passes += 1
+        yield from self._blocks
+
+    def text(self) -> str:
+        '''
+        Returns the whole document as a single string.
+        '''
+        return '\n'.join(self.lines())
+
+    # internal helpers
+    def _locate(self, index:int) -> tuple:
+        '''
+        Returns the block number and the offset inside the block of a line index.
+
+        Args:
+            index (int) : The index of the line.
+        '''
+        if not 0 <= index < self._count:
+            raise IndexError('line index out of range')
+        block = bisect_right(self._starts, index)-1
+        return block, index-self._starts[block]
+
+    def _split(self, index:int) -> int:
+        '''
+        Splits the block holding a line so that the line starts a block.
+        Returns the number of that block (the number of blocks for the index after the last line).
+
+        Args:
+            index (int) : The index of the line.
+        '''
+        if index == self._count:
+            return len(self._blocks)
+        block, offset = self._locate(index)
+        if offset:
+            lines = self._blocks[block]
+            if isinstance(lines, list):
+                self._blocks[block:block+1] = [lines[:offset], lines[offset:]]
+            else:
+                self._blocks[block:block+1] = lines.cut(offset, len(lines))+lines.cut(0, offset)
+            self._reindex(block)
+            block += 1
+        return block
+
+    def _materialize(self, block:int, offset:int) -> tuple:
+        '''
+        Reads the lines around a position of a span into a list block so they can be edited.
+        Returns the block number and the offset of the same line afterwards.
+
+        Args:
+            block (int), offset (int)   : The position of the line.
+        '''
+        span = self._blocks[block]
+        if isinstance(span, list):
+            return block, offset
+        start = offset-offset%BLOCK_SIZE
+        stop = min(start+BLOCK_SIZE, len(span))
+        before, after = span.cut(start, len(span)), span.cut(0, stop)
+        self._blocks[block:block+1] = before+[span[start:stop]]+after
+        self._reindex(block)
+        return block+len(before), offset-start
+
+    def _reindex(self, first:int) -> None:
+        '''
+        Recomputes the starting line of every block from the given block onwards.
+
+        Args:
+            first (int) : The number of the first block whose start may have changed.
+        '''
+        del self._starts[first:]
+        line = self._starts[-1]+len(self._blocks[first-1]) if first else 0
+        for block in self._blocks[first:]:
+            self._starts.append(line)
+            line += len(block)
+        self._count = line
@@ -0,0 +1,420 @@
+'''
+Differential Testing
+
+Runs random sequences of commands on two editing engines side by side, the
+original editor (the reference) and the editor as it is now (the candidate),
+and checks after every command that both hold the same lines and the same
+cursors. The documents and commands favour the cases that are easy to get
+wrong: runs of spaces and tabs, lines of spaces only, empty lines, the first and
+last character of a line and of the document, counts, registers, undo and redo.
+A failing sequence is shrunk to the fewest commands and lines that still fail
+before it is reported. Both engines also run every sequence once more without
+checks, to report how fast the candidate is compared to the reference.
+
+The original editor is a frozen copy of the procedural program the editor was
+rewritten from, baseline_editor.py, loaded afresh for every case. It only knows
+its own commands, so the cases have no counts, registers or redo when it is one
+of the engines. The editor differs from it on purpose in the ways listed in
+DIVERGENCES: a case stops being compared at the first command concerned.
+
+An engine is given as "module:function", where the function returns a new
+engine editing the given text. The module is looked for in the current
+directory too, or may be given as the path of its file, as in "fast.py:make".
+An engine runs commands with run(command), and exposes buffer.lines() and the
+row_curs_pos, line_curs_pos, row_curs_on and line_curs_on cursors like Session,
+or a state() method returning the same tuple as engine_state. To check a faster
+engine against the editor, give the editor as the reference:
+--reference difftest:session_engine --candidate fast.py:make.
+
+Usage:
+    python difftest.py [--reference MODULE:FUNCTION] [--candidate MODULE:FUNCTION] [-n SEQUENCES] [--length COMMANDS] [--seed SEED]
+'''
+
+# import library
+import argparse
+import importlib
+import importlib.util
+import os
+import random
+import re
+import sys
+import time
+from collections import namedtuple
+from buffer import LineBuffer
+from session import Session
+
+# a document and the commands run on it
+Case = namedtuple('Case', ['text', 'commands'])
+
+WORDS = ['a', 'ab', 'word', 'x_1', 'é', '.,;']
+SPACES = [' ', ' ', '  ', '   ', '\t', ' \t ']
+# commands with their weights; "i" and "a" get their text from generate_insert
+COMMANDS = {'h': 4, 'l': 4, 'j': 2, 'k': 2, '^': 2, '$': 2, 'w': 6, 'b': 6, '.': 1, ';': 1,
+            'i': 5, 'a': 5, 'x': 5, 'dw': 6, 'yy': 2, 'p': 3, 'P': 3, 'dd': 2, 'o': 2, 'O': 2,
+            'u': 4, 'U': 3, 'r': 3}
+COUNTED = ['x', 'dw', 'w', 'b', 'dd', 'yy', 'p', 'P', 'o', 'O', 'r', 'h', 'l']
+REGISTERS = ['"a', '"b']
+# the commands of the original editor that only move or show the cursors
+CURSOR_COMMANDS = ['h', 'l', 'j', 'k', '^', '$', 'w', 'b', '.', ';']
+# the ways the editor differs from the original editor on purpose
+DIVERGENCES = {'crash': 'the original editor raises an exception, as for k on an empty document, '
+                        'where the editor does nothing',
+               'markers': 'the original editor keeps the "*" of the line cursor in the text, so editing while it is '
+                          'shown edits the markers too; the editor draws the cursors without changing the text',
+               'moves': 'the original editor undoes cursor moves one at a time, the editor undoes them together with '
+                        'the edit that follows them'}
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline_editor.py')
+
+def session_engine(text:str) -> Session:
+    '''
+    Returns a quiet session editing the given text: the reference engine.
+
+    Args:
+        text (str)  : The document.
+    '''
+    session = Session(quiet=True)
+    session.buffer = LineBuffer(text)
+    return session
+
+class BaselineEngine:
+    '''
+    The original editor as an engine: a fresh copy of baseline_editor.py, whose globals hold the document.
+    It prints nothing and runs one command at a time instead of asking for the next one.
+    '''
+    original = True     # the cases only use the commands of the original editor
+    markup = re.compile('\033\\[42m|\033\\[0m')
+
+    def __init__(self, text:str) -> None:
+        '''
+        Loads a new copy of the original editor editing the given text.
+
+        Args:
+            text (str)  : The document.
+        '''
+        location = importlib.util.spec_from_file_location('baseline_editor', BASELINE_PATH)
+        self.module = importlib.util.module_from_spec(location)
+        location.loader.exec_module(self.module)
+        self.module.print = lambda *args, **kwargs: None
+        self.module.input = lambda prompt='': 'q'
+        self.module.main = lambda: None     # run() asks for the next command through main()
+        self.module.text = text
+        self.module.history = [('', text, 0, False, 0, False, '')]
+
+    def run(self, command:str) -> None:
+        '''
+        Runs a command.
+
+        Args:
+            command (str)   : The command.
+        '''
+        self.module.run(command)
+
+    def state(self) -> tuple:
+        '''
+        Returns the state of the original editor like engine_state, without the cursors drawn in its text.
+        '''
+        module = self.module
+        lines = self.markup.sub('', module.text).split('\n')
+        if module.line_curs_on:
+            lines = [line[1:] for line in lines]     # the "*" or space in front of every line
+        row_curs_pos = module.row_curs_pos-1 if module.line_curs_on else module.row_curs_pos
+        return (lines, module.line_curs_pos, row_curs_pos, module.row_curs_on, module.line_curs_on)
+
+    @staticmethod
+    def divergence(case:Case, step:int, states:list):
+        '''
+        Returns the key in DIVERGENCES of the intended difference the command of a case runs into, or None.
+
+        Args:
+            case (Case)     : The document and the commands.
+            step (int)      : The number of the command.
+            states (list)   : The states of the original editor after every command.
+        '''
+        command = case.commands[step]
+        if states[step][0] == 'error':
+            return 'crash'
+        if step and states[step-1][4] and command not in CURSOR_COMMANDS:
+            return 'markers'
+        if command == 'u' and any(previous in CURSOR_COMMANDS for previous in case.commands[:step]):
+            return 'moves'
+        return None
+
+def load_engine(spec:str):
+    '''
+    Returns the function creating the engines given as "module:function".
+    The module is a module name, found in the current directory too, or the path of a Python file.
+
+    Args:
+        spec (str)  : The module and the function, separated by a colon.
+    '''
+    module, _, function = spec.rpartition(':')
+    if not module or not function:
+        raise ValueError(f'Expected MODULE:FUNCTION, got "{spec}"')
+    if module.endswith('.py') or os.path.dirname(module):
+        name = os.path.splitext(os.path.basename(module))[0]
+        location = importlib.util.spec_from_file_location(name, module)
+        if location is None or not os.path.isfile(module):
+            raise ImportError(f'No module file {module}')
+        loaded = importlib.util.module_from_spec(location)
+        location.loader.exec_module(loaded)
+        return getattr(loaded, function)
+    if os.getcwd() not in sys.path:     # the script's own directory is searched, not the one it is run from
+        sys.path.insert(0, os.getcwd())
+    return getattr(importlib.import_module(module), function)
+
+def engine_state(engine) -> tuple:
+    '''
+    Returns what must be the same in both engines: the lines, the positions of the cursors and whether they are shown.
+
+    Args:
+        engine (object) : The engine.
+    '''
+    if hasattr(engine, 'state'):
+        return engine.state()
+    return (list(engine.buffer.lines()), engine.line_curs_pos, engine.row_curs_pos, engine.row_curs_on, engine.line_curs_on)
+
+def generate_line(rng:random.Random) -> str:
+    '''
+    Returns a random line: empty, spaces only, or words with runs of spaces around and between them.
+
+    Args:
+        rng (Random)    : The random number generator.
+    '''
+    kind = rng.random()
+    if kind < 0.15:
+        return ''
+    if kind < 0.25:
+        return rng.choice(SPACES)*rng.randint(1, 3)
+    parts = [rng.choice(SPACES) if rng.random() < 0.3 else '']
+    for _ in range(rng.randint(1, 5)):
+        parts += [rng.choice(WORDS), rng.choice(SPACES)]
+    if rng.random() < 0.5:
+        parts.pop()     # no space after the last word
+    return ''.join(parts)
+
+def generate_insert(rng:random.Random) -> str:
+    '''
+    Returns a random text to insert: a word, spaces, or both.
+
+    Args:
+        rng (Random)    : The random number generator.
+    '''
+    return rng.choice([rng.choice(WORDS), rng.choice(SPACES), rng.choice(WORDS)+rng.choice(SPACES),
+                       rng.choice(SPACES)+rng.choice(WORDS), ''])
+
+def generate_command(rng:random.Random, original:bool=False) -> str:
+    '''
+    Returns a random command, sometimes with a count or a register.
+
+    Args:
+        rng (Random)    : The random number generator.
+        original (bool) : Whether to only return commands of the original editor, without counts, registers or redo (default: False).
+    '''
+    commands = {command: weight for command, weight in COMMANDS.items() if not original or command != 'U'}
+    command = rng.choices(list(commands), weights=list(commands.values()))[0]
+    if command in ['i', 'a']:
+        return command+generate_insert(rng)
+    if original:
+        return command
+    if command in COUNTED and rng.random() < 0.15:
+        command = f'{rng.randint(2, 6)}{command}'
+    if command.lstrip('0123456789') in ['yy', 'p', 'P'] and rng.random() < 0.3:
+        command = rng.choice(REGISTERS)+command
+    return command
+
+def generate_case(rng:random.Random, length:int, original:bool=False) -> Case:
+    '''
+    Returns a random document and a random sequence of commands.
+
+    Args:
+        rng (Random)    : The random number generator.
+        length (int)    : The largest number of commands.
+        original (bool) : Whether to only use commands of the original editor (default: False).
+    '''
+    text = '\n'.join(generate_line(rng) for _ in range(rng.randint(1, 8)))
+    return Case(text, [generate_command(rng, original) for _ in range(rng.randint(1, length))])
+
+def run_case(factory, case:Case) -> list:
+    '''
+    Runs the commands of a case on a new engine.
+    Returns the state of the engine after every command; an exception ends the list with its description.
+
+    Args:
+        factory (function)  : Returns a new engine editing a text.
+        case (Case)         : The document and the commands.
+    '''
+    states = []
+    try:
+        engine = factory(case.text)
+        for command in case.commands:
+            engine.run(command)
+            states.append(engine_state(engine))
+    except Exception as error:
+        states.append(('error', f'{type(error).__name__}: {error}'))
+    return states
+
+def first_difference(reference, candidate, case:Case):
+    '''
+    Returns the number of the first command after which the engines differ, or None if they never do.
+    If the reference knows its intended differences, comparing stops at the first one.
+
+    Args:
+        reference (function)    : Returns a new reference engine.
+        candidate (function)    : Returns a new candidate engine.
+        case (Case)             : The document and the commands.
+    '''
+    expected, actual = run_case(reference, case), run_case(candidate, case)
+    divergence = getattr(reference, 'divergence', None)
+    for step, (first, second) in enumerate(zip(expected, actual)):
+        if divergence and divergence(case, step, expected):
+            return None
+        if first != second:
+            return step
+    return None if len(expected) == len(actual) else min(len(expected), len(actual))
+
+def shrink_list(items:list, fails, keep:int=0) -> list:
+    '''
+    Removes as many items as possible from a list while it still fails,
+    trying to remove large chunks first and then smaller ones.
+
+    Args:
+        items (list)        : The items.
+        fails (function)    : Returns whether a list of items still fails.
+        keep (int)          : The smallest number of items (default: 0).
+    '''
+    size = max(1, len(items)//2)
+    while size >= 1:
+        start = 0
+        while start < len(items):
+            trial = items[:start]+items[start+size:]
+            if len(trial) >= keep and trial != items and fails(trial):
+                items = trial
+            else:
+                start += size
+        size //= 2
+    return items
+
+def shrink(reference, candidate, case:Case) -> Case:
+    '''
+    Returns the smallest case found that still makes the engines differ:
+    fewer commands, fewer lines, then shorter lines and inserted texts.
+
+    Args:
+        reference (function)    : Returns a new reference engine.
+        candidate (function)    : Returns a new candidate engine.
+        case (Case)             : The failing case.
+    '''
+    def fails(trial:Case) -> bool:
+        return first_difference(reference, candidate, trial) is not None
+
+    while True:
+        previous = case
+        step = first_difference(reference, candidate, case)
+        case = case._replace(commands=case.commands[:step+1])   # nothing after the first difference matters
+        case = case._replace(commands=shrink_list(case.commands, lambda commands: fails(case._replace(commands=commands))))
+        lines = shrink_list(case.text.split('\n'), lambda lines: fails(case._replace(text='\n'.join(lines))), keep=1)
+        for number in range(len(lines)):
+            characters = shrink_list(list(lines[number]), lambda characters: fails(case._replace(
+                text='\n'.join(lines[:number]+[''.join(characters)]+lines[number+1:]))))
+            lines[number] = ''.join(characters)
+        case = case._replace(text='\n'.join(lines))
+        commands = case.commands
+        for number, command in enumerate(commands):
+            if command[:1] in ['i', 'a'] and len(command) > 1:
+                text = shrink_list(list(command[1:]), lambda text: fails(case._replace(
+                    commands=commands[:number]+[command[0]+''.join(text)]+commands[number+1:])))
+                commands = commands[:number]+[command[0]+''.join(text)]+commands[number+1:]
+                case = case._replace(commands=commands)
+        if case == previous:
+            return case
+
+def time_cases(factory, cases:list) -> float:
+    '''
+    Returns the seconds an engine takes to run every case, without reading its state.
+
+    Args:
+        factory (function)  : Returns a new engine editing a text.
+        cases (list)        : The cases.
+    '''
+    seconds = 0.0
+    for case in cases:
+        engine = factory(case.text)
+        start = time.perf_counter()
+        try:
+            for command in case.commands:
+                engine.run(command)
+        except Exception:
+            pass    # reported by the comparison
+        seconds += time.perf_counter()-start
+    return seconds
+
+def report(reference, candidate, case:Case, log=sys.stdout) -> None:
+    '''
+    Prints a failing case and the states of both engines at the first difference.
+
+    Args:
+        reference (function)    : Returns a new reference engine.
+        candidate (function)    : Returns a new candidate engine.
+        case (Case)             : The failing case.
+        log (file)              : The stream the report is written to.
+    '''
+    step = first_difference(reference, candidate, case)
+    expected, actual = run_case(reference, case), run_case(candidate, case)
+    print(f'document: {case.text!r}', file=log)
+    print(f'commands: {case.commands!r}', file=log)
+    print(f'after command {step+1} ({case.commands[step]!r}):' if step < len(case.commands) else 'at the end:', file=log)
+    print(f'  reference: {expected[step] if step < len(expected) else "(stopped)"!r}', file=log)
+    print(f'  candidate: {actual[step] if step < len(actual) else "(stopped)"!r}', file=log)
+
+def main(argv:list=None) -> int:
+    '''
+    Compares two engines on random cases from the command line.
+    Returns the exit status of the program: 1 if the engines differ.
+
+    Args:
+        argv (list) : The command line arguments (default: sys.argv[1:]).
+    '''
+    parser = argparse.ArgumentParser(description='Compare an editing engine with the reference on random commands.')
+    parser.add_argument('--candidate', default='difftest:session_engine',
+                        help='engine to check, as MODULE:FUNCTION or FILE.py:FUNCTION (default: the editor)')
+    parser.add_argument('--reference', default='difftest:BaselineEngine',
+                        help='engine giving the expected states (default: the original editor)')
+    parser.add_argument('-n', '--cases', type=int, default=500, help='number of random cases (default: 500)')
+    parser.add_argument('--length', type=int, default=40, help='largest number of commands of a case (default: 40)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the cases (default: 0)')
+    parser.add_argument('--failures', type=int, default=3, help='number of failing cases shrunk and reported (default: 3)')
+    args = parser.parse_args(argv)
+    try:
+        reference = load_engine(args.reference)
+        candidate = load_engine(args.candidate)
+    except (ImportError, AttributeError, ValueError) as error:
+        parser.error(str(error))
+    if args.candidate == args.reference:
+        print(f'{args.reference} is compared with itself, which only checks that it is deterministic')
+    if hasattr(reference, 'divergence'):
+        print('Cases stop being compared where the editor differs on purpose:')
+        for name, description in DIVERGENCES.items():
+            print(f'  {name}: {description}')
+
+    rng = random.Random(args.seed)
+    original = getattr(reference, 'original', False) or getattr(candidate, 'original', False)
+    cases = [generate_case(rng, args.length, original) for _ in range(args.cases)]
+    failures = 0
+    for number, case in enumerate(cases):
+        if first_difference(reference, candidate, case) is None:
+            continue
+        failures += 1
+        if failures <= args.failures:
+            print(f'case {number} differs, shrunk from {len(case.commands)} commands:')
+            report(reference, candidate, shrink(reference, candidate, case))
+    print(f'{failures}/{len(cases)} cases differ')
+
+    reference_seconds, candidate_seconds = time_cases(reference, cases), time_cases(candidate, cases)
+    commands = sum(len(case.commands) for case in cases)
+    print(f'reference: {reference_seconds:.3f} s ({commands/reference_seconds:.0f} commands/s)')
+    print(f'candidate: {candidate_seconds:.3f} s ({commands/candidate_seconds:.0f} commands/s), '
+          f'{reference_seconds/candidate_seconds:.2f}x the speed of the reference')
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
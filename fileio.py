@@ -0,0 +1,172 @@
+'''
+File Input and Output
+
+Opens files through a memory map so that even very large files open quickly:
+opening only counts the line breaks of every chunk of the file, the positions of
+the lines in a chunk are indexed when a line of that chunk is first read, and
+lines are decoded only when they are viewed or edited. Saving copies the
+unmodified parts of a file as raw bytes and replaces the target file atomically.
+'''
+
+# import library
+import mmap
+import os
+import tempfile
+from array import array
+from bisect import bisect_right
+from buffer import ENCODING, ERRORS, LineBuffer, PackedLines, Span
+
+# size of the chunks used to index and copy files
+CHUNK_SIZE = 1 << 20
+
+class MappedFile:
+    '''
+    The lines of a file, read through a memory map.
+
+    Args:
+        path (str)  : The path of the file.
+    '''
+    def __init__(self, path:str):
+        self.path = path
+        with open(path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self._size = size
+        # number of line breaks before every chunk
+        self._breaks_before = array('Q')
+        breaks = 0
+        for start in range(0, size, CHUNK_SIZE):
+            self._breaks_before.append(breaks)
+            breaks += self._data[start:start+CHUNK_SIZE].count(b'\n')
+        self._breaks = breaks
+        self._chunk_breaks = {}     # chunk number -> positions of its line breaks from the start of the chunk, built on first use
+
+    def line_count(self) -> int:
+        '''
+        Returns the number of lines in the file.
+        '''
+        return self._breaks+1
+
+    def get_line(self, index:int) -> str:
+        '''
+        Returns the line at the given index.
+
+        Args:
+            index (int) : The index of the line.
+        '''
+        return self._data[self.line_start(index):self.line_end(index)].decode(ENCODING, ERRORS)
+
+    def get_lines(self, start:int, stop:int) -> list:
+        '''
+        Returns the lines between "start" and "stop".
+
+        Args:
+            start (int), stop (int) : The range of line indices.
+        '''
+        if start >= stop:
+            return []
+        return self.raw(start, stop).decode(ENCODING, ERRORS).split('\n')
+
+    def raw(self, start:int, stop:int) -> bytes:
+        '''
+        Returns the bytes of the lines between "start" and "stop", without the final line break.
+
+        Args:
+            start (int), stop (int) : The range of line indices.
+        '''
+        return self._data[self.line_start(start):self.line_end(stop-1)]
+
+    def write_raw(self, file, start:int, stop:int) -> None:
+        '''
+        Writes the bytes of the lines between "start" and "stop" to a file, one chunk at a time.
+
+        Args:
+            file (file)             : The binary file to write to.
+            start (int), stop (int) : The range of line indices.
+        '''
+        begin, end = self.line_start(start), self.line_end(stop-1)
+        for position in range(begin, end, CHUNK_SIZE):
+            file.write(self._data[position:min(position+CHUNK_SIZE, end)])
+
+    def line_start(self, index:int) -> int:
+        '''
+        Returns the position of the first byte of a line.
+
+        Args:
+            index (int) : The index of the line.
+        '''
+        return 0 if index == 0 else self._break_position(index-1)+1
+
+    def line_end(self, index:int) -> int:
+        '''
+        Returns the position of the line break that ends a line (the file size for the last line).
+
+        Args:
+            index (int) : The index of the line.
+        '''
+        return self._size if index == self._breaks else self._break_position(index)
+
+    def _break_position(self, number:int) -> int:
+        '''
+        Returns the position of a line break, indexing its chunk if needed.
+
+        Args:
+            number (int)    : The number of the line break (0: the first one).
+        '''
+        if not 0 <= number < self._breaks:
+            raise IndexError('line index out of range')
+        chunk = bisect_right(self._breaks_before, number)-1
+        start = chunk*CHUNK_SIZE
+        positions = self._chunk_breaks.get(chunk)
+        if positions is None:
+            positions = array('I')  # a chunk is small enough for 4-byte positions
+            stop = min(start+CHUNK_SIZE, self._size)
+            position = self._data.find(b'\n', start, stop)
+            while position != -1:
+                positions.append(position-start)
+                position = self._data.find(b'\n', position+1, stop)
+            self._chunk_breaks[chunk] = positions
+        return start+positions[number-self._breaks_before[chunk]]
+
+def open_file(path:str) -> LineBuffer:
+    '''
+    Returns a buffer holding the lines of a file, without reading them yet.
+
+    Args:
+        path (str)  : The path of the file.
+    '''
+    return LineBuffer.from_source(MappedFile(path))
+
+def save_file(buffer:LineBuffer, path:str) -> None:
+    '''
+    Writes the buffer to a file.
+    The content is written to a temporary file which then replaces the target,
+    so the target is never left half-written.
+
+    Args:
+        buffer (LineBuffer) : The document.
+        path (str)          : The path of the file.
+    '''
+    directory, name = os.path.split(os.path.abspath(path))
+    descriptor, temporary = tempfile.mkstemp(prefix='.'+name+'.', dir=directory)
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            for number, block in enumerate(buffer.blocks()):
+                if number:
+                    file.write(b'\n')
+                if isinstance(block, Span) and isinstance(block.source, (MappedFile, PackedLines)):   # unmodified lines: copy the bytes
+                    block.source.write_raw(file, block.start, block.start+block.count)
+                else:
+                    file.write('\n'.join(block).encode(ENCODING, ERRORS))
+            file.flush()
+            os.fsync(file.fileno())
+        if os.path.exists(path):
+            os.chmod(temporary, os.stat(path).st_mode)
+        else:   # the permissions a newly created file would get
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temporary, 0o666 & ~umask)
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
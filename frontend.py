@@ -0,0 +1,214 @@
+'''
+Asynchronous Front End
+
+Runs the editor on an asyncio event loop, where reading the input, running the
+commands, drawing the screen and saving run as separate tasks:
+- the input is read by a background thread, so typing is never blocked;
+- the commands typed in quick succession are displayed in a single frame,
+  drawn at most a given number of times per second;
+- writing a file with :w saves a snapshot of the document in a worker thread,
+  so even a very large save does not stop the next commands;
+- if a command crashes, the changes of a document with a file are left in its
+  journal, restored by :recover once the file is opened again, and a document
+  without a journal is saved to a crash file.
+
+Usage:
+    python frontend.py [FILE] [--fps FRAMES]
+'''
+
+# import library
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+from session import Session, parse_command
+from fileio import save_file
+from render import DeferredScreen
+
+def crash_path(path:str) -> str:
+    '''
+    Returns the path of the crash file of a document without a journal: a hidden file next to it,
+    or a file in the temporary directory for a document without a file.
+    It holds the document as plain text, to be opened as any file.
+
+    Args:
+        path (str)  : The path of the document ('' if it has none).
+    '''
+    if not path:
+        return os.path.join(tempfile.gettempdir(), f'untitled-{os.getpid()}.crash.txt')
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, f'.{name}.crash')
+
+class Frontend:
+    '''
+    Runs a session on an event loop.
+
+    Args:
+        session (Session)   : The session to run.
+        fps (float)         : The maximum number of frames drawn per second.
+    '''
+    def __init__(self, session:Session, fps:float=60.0):
+        self.session = session
+        self.frame_time = 1/fps
+        self.screen = DeferredScreen()
+        session.screen = self.screen
+        self.queue = None           # lines typed by the user, None at the end of the input
+        self.frame = None           # set when the screen or the prompt must be drawn
+        self.saving = None          # lock held while a file is written
+        self.writes = set()         # files being written
+
+    async def run(self) -> None:
+        '''
+        Runs the editor until the user quits or the input ends.
+        '''
+        loop = asyncio.get_running_loop()
+        self.queue, self.frame, self.saving = asyncio.Queue(), asyncio.Event(), asyncio.Lock()
+        threading.Thread(target=self.read_input, args=(loop,), daemon=True).start()
+        tasks = [asyncio.create_task(self.draw_frames())]
+        self.prompt()
+        try:
+            await self.run_commands()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if self.writes:     # files must be complete before the program ends
+                await asyncio.gather(*self.writes, return_exceptions=True)
+            self.screen.flush()
+        self.session.close()
+
+    def read_input(self, loop) -> None:
+        '''
+        Reads the lines typed by the user and queues them on the event loop, until the input ends.
+        Runs in its own thread.
+
+        Args:
+            loop (AbstractEventLoop)    : The event loop running the editor.
+        '''
+        for line in sys.stdin:
+            loop.call_soon_threadsafe(self.queue.put_nowait, line.rstrip('\r\n'))
+        loop.call_soon_threadsafe(self.queue.put_nowait, None)
+
+    async def run_commands(self) -> None:
+        '''
+        Runs the queued commands in order, asking for a frame once no command is waiting.
+        If a command crashes, a document without a journal is saved to its crash file first.
+        '''
+        while True:
+            user_input = await self.queue.get()
+            if user_input is None:
+                return
+            command, argument = parse_command(user_input) if user_input else ('', [])
+            if command in [':e', ':e!', ':bn', ':bp', ':recover'] and self.writes:     # a write reports to the document it started from
+                await asyncio.gather(*self.writes, return_exceptions=True)
+            try:
+                if command == ':w':
+                    self.write(*argument)
+                elif not self.session.run(user_input):
+                    return
+            except Exception:
+                self.save_crash()
+                raise
+            if self.queue.empty():
+                self.frame.set()
+
+    async def draw_frames(self) -> None:
+        '''
+        Draws the last waiting frame and the prompt, at most once per frame time.
+        '''
+        while True:
+            await self.frame.wait()
+            await asyncio.sleep(self.frame_time)    # commands typed meanwhile join this frame
+            self.frame.clear()
+            self.screen.flush()
+            self.prompt()
+
+    def prompt(self) -> None:
+        '''
+        Writes the prompt.
+        '''
+        sys.stdout.write('>')
+        sys.stdout.flush()
+
+    def write(self, line_range:str='', path:str='') -> None:
+        '''
+        Starts writing a snapshot of the document, or of the lines of a range, to a file in a worker thread.
+        Without a path, the document is written to the file it was opened from.
+
+        Args:
+            line_range (str)    : The range of lines (default: the whole document).
+            path (str)          : The path of the file (default: the opened file).
+        '''
+        written = self.session.prepare_write(line_range, path)
+        if not written:
+            return
+        path, buffer = written
+        journal = self.session.history.journal
+        position = journal.position() if journal and not line_range else None
+        task = asyncio.create_task(self.write_snapshot(buffer.snapshot(), path, position, not line_range))
+        self.writes.add(task)
+        task.add_done_callback(self.writes.discard)
+
+    async def write_snapshot(self, snapshot, path:str, position:tuple=None, whole:bool=True) -> None:
+        '''
+        Writes a snapshot of the document to a file and reports it.
+
+        Args:
+            snapshot (LineBuffer)   : The snapshot of the document.
+            path (str)              : The path of the file.
+            position (tuple)        : The position of the journal when the snapshot was taken (default: None).
+            whole (bool)            : Whether the snapshot holds the whole document rather than a range (default: True).
+        '''
+        async with self.saving:
+            try:
+                await asyncio.to_thread(save_file, snapshot, path)
+            except OSError as error:
+                self.session.message(error)
+                return
+        if whole:
+            self.session.document_written(path, position, snapshot.version)
+        self.session.message(f'"{path}" {snapshot.line_count()} lines written')
+        self.frame.set()
+
+    def save_crash(self) -> None:
+        '''
+        Tells where the changes of the document can be found after a command crashed:
+        its journal, or else a crash file the document is saved to.
+        A crash file that cannot be written is reported, without hiding the crash itself.
+        '''
+        journal = self.session.history.journal
+        if journal:     # without a journal file, nothing changed since the file was read or written
+            if journal.exists():
+                print(f'Changes kept in "{journal.journal_path}", open "{self.session.file_path}" and use ":recover" to restore them',
+                      file=sys.stderr)
+            return
+        path = crash_path(self.session.file_path)
+        try:
+            save_file(self.session.buffer, path)
+        except OSError as error:
+            print(f'Crash file "{path}" could not be written: {error}', file=sys.stderr)
+            return
+        print(f'Document saved to "{path}"', file=sys.stderr)
+
+def main(argv:list=None) -> int:
+    '''
+    Runs the editor on an event loop from the command line.
+    Returns the exit status of the program.
+
+    Args:
+        argv (list) : The command line arguments (default: sys.argv[1:]).
+    '''
+    parser = argparse.ArgumentParser(description='Run the editor with background saving and coalesced rendering.')
+    parser.add_argument('file', nargs='?', help='file to open')
+    parser.add_argument('--fps', type=float, default=60.0, help='maximum frames drawn per second (default: 60)')
+    args = parser.parse_args(argv)
+    session = Session()
+    if args.file:
+        session.open_document(args.file)
+    asyncio.run(Frontend(session, args.fps).run())
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,315 @@
+'''
+Syntax Highlighting
+
+Colors the keywords, strings, comments and numbers of code and configuration
+files as they are drawn. Only the displayed copy of a line is colored, never the
+document. A lexer reads a line from the state left by the line above it, such as
+inside a multi-line string or comment, and returns the state it leaves. The state
+at the start of every line is cached, so drawing a frame only lexes its visible
+lines. After an edit, the states are recomputed from the first edited line only
+until a recomputed state equals the cached one again; every state below it is
+then still right. The states are computed only down to the lines being drawn,
+and only so many lines are lexed for a frame: a frame far below the lines lexed
+so far is colored from a guessed state while the following frames catch up.
+Finding the state of a line only searches for the tokens that can change it
+(strings and comments), which is much faster than lexing it for display.
+'''
+
+# import library
+import keyword
+import os
+import re
+from collections import namedtuple
+
+# a rule of a lexer state: a pattern without capturing groups, the kind of token it matches,
+# and the state the lexer is in after it (None: the same state)
+Rule = namedtuple('Rule', ['pattern', 'kind', 'next'])
+
+# a state of a lexer: the characters that can start a string or a comment in it, as the inside of
+# a character class (None: any character), and its rules, tried in order at every position
+State = namedtuple('State', ['opening', 'rules'])
+
+# display attributes of every kind of token, as ANSI color codes
+COLORS = {'keyword': '35', 'string': '33', 'comment': '36', 'number': '32', 'name': '34'}
+
+# number of lines lexed at most to draw a frame, about 10 ms; the lines below them are colored from a guessed state
+FRAME_LINES = 2000
+
+# kinds of tokens that can hide the start of other tokens, or change the state of the lexer
+OPAQUE = ['string', 'comment']
+
+NUMBER = r'\b(?:0[xXoObB][0-9a-fA-F_]+|\d[\d_]*(?:\.\d*)?(?:[eE][+-]?\d+)?)\b'
+C_KEYWORDS = ['auto', 'break', 'case', 'catch', 'char', 'class', 'const', 'continue', 'default', 'delete', 'do',
+              'double', 'else', 'enum', 'export', 'extends', 'extern', 'false', 'final', 'float', 'for', 'func',
+              'function', 'go', 'if', 'import', 'int', 'let', 'long', 'new', 'null', 'package', 'private', 'public',
+              'return', 'short', 'static', 'struct', 'switch', 'this', 'throw', 'true', 'try', 'typedef', 'var',
+              'void', 'while']
+
+# the states of every language; every lexer starts in the state "root"
+LANGUAGES = {
+    'python': {
+        'root': State('#"\'rbuRBUfF', [
+            Rule(r'#.*', 'comment', None),
+            Rule(r'[rbuRBUfF]{0,2}"""', 'string', 'string"""'),
+            Rule(r"[rbuRBUfF]{0,2}'''", 'string', "string'''"),
+            Rule(r'[rbuRBUfF]{0,2}"(?:\\.|[^"\\])*"?', 'string', None),
+            Rule(r"[rbuRBUfF]{0,2}'(?:\\.|[^'\\])*'?", 'string', None),
+            Rule(r'\b(?:%s)\b' % '|'.join(keyword.kwlist), 'keyword', None),
+            Rule(NUMBER+r'j?', 'number', None)]),
+        'string"""': State(None, [Rule(r'(?:\\.|[^"\\]|"(?!""))*"""', 'string', 'root'), Rule(r'.+', 'string', None)]),
+        "string'''": State(None, [Rule(r"(?:\\.|[^'\\]|'(?!''))*'''", 'string', 'root'), Rule(r'.+', 'string', None)])},
+    'c': {
+        'root': State('/"\'`', [
+            Rule(r'//.*', 'comment', None),
+            Rule(r'/\*(?:[^*]|\*(?!/))*\*/', 'comment', None),
+            Rule(r'/\*.*', 'comment', 'comment'),
+            Rule(r'"(?:\\.|[^"\\])*"?', 'string', None),
+            Rule(r"'(?:\\.|[^'\\])*'?", 'string', None),
+            Rule(r'`(?:\\.|[^`\\])*`', 'string', None),
+            Rule(r'^\s*#\s*\w+', 'keyword', None),
+            Rule(r'\b(?:%s)\b' % '|'.join(C_KEYWORDS), 'keyword', None),
+            Rule(NUMBER+r'[uUlLfF]*', 'number', None)]),
+        'comment': State(None, [Rule(r'(?:[^*]|\*(?!/))*\*/', 'comment', 'root'), Rule(r'.+', 'comment', None)])},
+    'json': {
+        'root': State('"', [
+            Rule(r'"(?:\\.|[^"\\])*"(?=\s*:)', 'name', None),
+            Rule(r'"(?:\\.|[^"\\])*"?', 'string', None),
+            Rule(r'\b(?:true|false|null)\b', 'keyword', None),
+            Rule(r'-?'+NUMBER, 'number', None)])},
+    'config': {
+        'root': State('#;"\'\\s', [
+            Rule(r'^\s*[#;].*', 'comment', None),
+            Rule(r'\s#.*', 'comment', None),
+            Rule(r'^\s*\[[^\]"\']*\]*', 'keyword', None),
+            Rule(r'^\s*[\w.\-]+(?=\s*[=:])', 'name', None),
+            Rule(r'"""', 'string', 'string"""'),
+            Rule(r'"(?:\\.|[^"\\])*"?', 'string', None),
+            Rule(r"'[^']*'?", 'string', None),
+            Rule(r'\b(?:true|false|yes|no|on|off|null)\b', 'keyword', None),
+            Rule(NUMBER, 'number', None)]),
+        'string"""': State(None, [Rule(r'(?:\\.|[^"\\]|"(?!""))*"""', 'string', 'root'), Rule(r'.+', 'string', None)])}}
+
+# language of every file extension
+EXTENSIONS = {'.py': 'python', '.pyw': 'python', '.pyi': 'python',
+              '.c': 'c', '.h': 'c', '.cc': 'c', '.cpp': 'c', '.hpp': 'c', '.cs': 'c', '.java': 'c', '.js': 'c',
+              '.ts': 'c', '.go': 'c', '.rs': 'c', '.css': 'c', '.json': 'json',
+              '.ini': 'config', '.cfg': 'config', '.conf': 'config', '.toml': 'config', '.properties': 'config',
+              '.yaml': 'config', '.yml': 'config', '.env': 'config', '.sh': 'config'}
+
+def language_for(path:str) -> str:
+    '''
+    Returns the language of a file according to its extension, or None if it has none known.
+
+    Args:
+        path (str)  : The path of the file.
+    '''
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower())
+
+def color(text:str, attributes:str) -> str:
+    '''
+    Returns the text displayed with the given attributes.
+
+    Args:
+        text (str)          : The text.
+        attributes (str)    : The ANSI codes of the attributes, separated by ";" (empty: none).
+    '''
+    return f'\033[{attributes}m{text}\033[0m' if text and attributes else text
+
+def paint(line:str, tokens:list, cursor:int=None) -> str:
+    '''
+    Returns the line as it is displayed: every token in its color, and the row cursor highlighted.
+
+    Args:
+        line (str)      : The line.
+        tokens (list)   : The tokens of the line, as (start, end, kind), in order.
+        cursor (int)    : The index of the character under the row cursor (default: no cursor).
+    '''
+    segments, position = [], 0
+    for start, end, kind in tokens:
+        segments += [(position, start, ''), (start, end, COLORS[kind])]
+        position = end
+    segments.append((position, len(line), ''))
+    parts = []
+    for start, end, attributes in segments:
+        if cursor is not None and start <= cursor < end:
+            parts += [color(line[start:cursor], attributes), color(line[cursor], f'{attributes};42' if attributes else '42'),
+                      color(line[cursor+1:end], attributes)]
+        else:
+            parts.append(color(line[start:end], attributes))
+    return ''.join(parts)
+
+class Lexer:
+    '''
+    Splits lines into tokens according to the rules of the states of a language.
+
+    Args:
+        states (dict)   : The State of every name, including "root".
+    '''
+    def __init__(self, states:dict):
+        self.rules = {name: state.rules for name, state in states.items()}
+        self.patterns = {name: re.compile('|'.join(f'({rule.pattern})' for rule in state.rules))
+                         for name, state in states.items()}
+        self.opaque = {}    # name of a state -> (pattern of the tokens that may change the state, their rules)
+        for name, state in states.items():
+            rules = [rule for rule in state.rules if rule.kind in OPAQUE or rule.next]
+            if rules:
+                pattern = '|'.join(f'({rule.pattern})' for rule in rules)
+                if state.opening:   # checked first, so most positions are rejected at once
+                    pattern = f'(?=[{state.opening}])(?:{pattern})'
+                self.opaque[name] = (re.compile(pattern), rules)
+
+    def tokens(self, line:str, state:str) -> tuple:
+        '''
+        Returns the tokens of a line, as (start, end, kind), and the state at its end.
+
+        Args:
+            line (str)  : The line.
+            state (str) : The state at the start of the line.
+        '''
+        tokens, position = [], 0
+        while True:
+            match = self.patterns[state].search(line, position)
+            if not match or match.end() == match.start():
+                return tokens, state
+            rule = self.rules[state][match.lastindex-1]
+            if tokens and tokens[-1][1] == match.start() and tokens[-1][2] == rule.kind:   # one token, split by a change of state
+                tokens[-1] = (tokens[-1][0], match.end(), rule.kind)
+            else:
+                tokens.append((match.start(), match.end(), rule.kind))
+            state, position = rule.next or state, match.end()
+
+    def end_state(self, line:str, state:str) -> str:
+        '''
+        Returns the state at the end of a line, without finding its keywords and numbers.
+
+        Args:
+            line (str)  : The line.
+            state (str) : The state at the start of the line.
+        '''
+        position = 0
+        while state in self.opaque:
+            pattern, rules = self.opaque[state]
+            match = pattern.search(line, position)
+            if not match or match.end() == match.start():
+                break
+            state, position = rules[match.lastindex-1].next or state, match.end()
+        return state
+
+class Highlighter:
+    '''
+    Colors the lines of a document, keeping the lexer state at the start of every line lexed so far.
+    It follows the edits of the document through its history.
+
+    Args:
+        language (str)      : The language of the document, a key of LANGUAGES (None: nothing is colored).
+        buffer (LineBuffer) : The document.
+        history (History)   : The history of the document, which passes on its edits.
+    '''
+    def __init__(self, language:str, buffer, history):
+        self.language = language
+        self.lexer = Lexer(LANGUAGES[language]) if language else None
+        self.buffer = buffer
+        self.history = history
+        self.states = ['root']  # states[i]: the state at the start of line i
+        self.valid = 1          # number of states known to be right, the others are recomputed when needed
+        self.tail = 0           # index of the first state of those below the valid ones that still follow from each other:
+                                # a recomputed state can only converge from there
+        self.budget = None      # number of lines that may still be lexed for the frame being drawn (None: no limit)
+        self._guess = (0, 'root')   # the line after the last one painted and its state, when the state was guessed
+        history.listeners.append(self.edited)
+
+    def new_frame(self, budget:int=FRAME_LINES) -> None:
+        '''
+        Sets the number of lines that may be lexed to draw the next frame.
+
+        Args:
+            budget (int)    : The number of lines (default: FRAME_LINES; None: no limit).
+        '''
+        self.budget = budget
+
+    def close(self) -> None:
+        '''
+        Stops following the edits of the document.
+        '''
+        self.history.listeners.remove(self.edited)
+
+    def edited(self, edits:list) -> None:
+        '''
+        Moves the cached states along with the lines edited, and marks those after the first edited line as stale.
+        The states of the lines after the edited ones are kept, to tell when the recomputed states converge,
+        as long as they still follow from each other.
+
+        Args:
+            edits (list)    : The edits, in the order they were applied.
+        '''
+        for index, old, new in edits:
+            tail = 0 if self.valid >= len(self.states) else max(self.valid, self.tail)
+            end = index+len(old)    # the first line after the edit: its state moves with it to index+len(new)
+            if end >= len(self.states):
+                del self.states[index+1:]
+                self.tail = index+1
+            elif new:   # the states inside the new lines are unknown
+                self.states[index+1:end+1] = [None]*(len(new)-1)+[self.states[end]]
+                self.tail = tail+len(new)-len(old) if tail > end else index+len(new)
+            elif index >= self.valid:
+                self.states[index:end+1] = [self.states[end]]
+                self.tail = tail-len(old) if tail > end else index
+            else:   # the state of the line at index is still right, but the state below it no longer follows from it
+                del self.states[index+1:end+1]
+                self.tail = tail-len(old) if tail > end else index+1
+            self.valid = min(self.valid, index+1)
+
+    def state(self, index:int) -> str:
+        '''
+        Returns the state at the start of a line, lexing the lines above it that are not known yet,
+        or None if the budget of the frame runs out first.
+
+        Args:
+            index (int) : The index of the line.
+        '''
+        while index >= self.valid:
+            if self.budget is not None and self.budget <= 0:
+                return None
+            start = self.valid
+            stop = index if self.budget is None else min(index, start-1+self.budget)
+            state, line_index = self.states[start-1], start
+            for line in self.buffer.lines(start-1, stop):
+                state = self.lexer.end_state(line, state)
+                if line_index < len(self.states):
+                    if line_index >= self.tail and self.states[line_index] == state:   # converged
+                        self.valid, self.tail = len(self.states), 0
+                        break
+                    self.states[line_index] = state
+                else:
+                    self.states.append(state)
+                line_index += 1
+            else:
+                self.valid = line_index
+                if line_index < len(self.states):   # the cached states below do not follow from those recomputed
+                    self.tail = max(self.tail, line_index)
+            if self.budget is not None:
+                self.budget -= line_index-start+1
+        return self.states[index]
+
+    def paint(self, line:str, index:int, cursor:int=None) -> str:
+        '''
+        Returns a line as it is displayed, colored, with the row cursor highlighted.
+        When its state is not known within the budget of the frame, it is guessed: the state
+        after the line painted above it, or else its last known state.
+
+        Args:
+            line (str)      : The content of the line, possibly cut to the width of the screen.
+            index (int)     : The index of the line.
+            cursor (int)    : The index of the character under the row cursor (default: no cursor).
+        '''
+        if self.lexer is None:
+            return paint(line, [], cursor)
+        state = self.state(index)
+        if state is None:
+            if self._guess[0] == index:
+                state = self._guess[1]
+            else:
+                state = self.states[index] if index < len(self.states) and self.states[index] else 'root'
+        tokens, end = self.lexer.tokens(line, state)
+        self._guess = (index+1, end)
+        return paint(line, tokens, cursor)
@@ -0,0 +1,225 @@
+'''
+Edit History
+
+Records every command as the list of reversible line edits it made, so undo and
+redo only replay the lines that changed instead of restoring a snapshot of the
+whole document.
+'''
+
+# import library
+from collections import deque, namedtuple
+
+# an edit replaces the lines "old" starting at line "index" with the lines "new",
+# given as lists, or as LineBuffers for large ranges moved out of the document without being read
+Edit = namedtuple('Edit', ['index', 'old', 'new'])
+
+# a command in the history: the edits it made and the editor state around it
+Entry = namedtuple('Entry', ['command', 'edits', 'before', 'after', 'cursor_only', 'size'])
+
+def apply_edit(buffer, edit:Edit) -> None:
+    '''
+    Applies an edit to the buffer.
+
+    Args:
+        buffer (LineBuffer) : The document.
+        edit (Edit)         : The edit to apply.
+    '''
+    if len(edit.old) == len(edit.new) == 1:
+        buffer.set_line(edit.index, edit.new[0])
+    else:
+        buffer.delete(edit.index, len(edit.old))
+        buffer.insert(edit.index, edit.new)
+
+def merge_edits(first:Edit, second:Edit) -> bool:
+    '''
+    Merges an edit into the edit made just before it, when the second one only touches the
+    lines written by the first one or the lines right after them, as repeated commands do.
+    The lines of the first edit are extended in place, so merging a run of edits stays linear.
+    Returns whether the edits were merged.
+
+    Args:
+        first (Edit)    : The earlier edit, which receives the second one.
+        second (Edit)   : The later edit.
+    '''
+    if not all(isinstance(lines, list) for lines in first[1:]+second[1:]):    # large ranges stay separate
+        return False
+    offset = second.index-first.index
+    if 0 <= offset and offset+len(second.old) <= len(first.new):     # inside the lines written by the first edit
+        first.new[offset:offset+len(second.old)] = second.new
+    elif offset == len(first.new):     # right after them
+        first.old.extend(second.old)
+        first.new.extend(second.new)
+    else:
+        return False
+    return True
+
+def edit_size(edit:Edit) -> int:
+    '''
+    Returns the number of characters an edit holds in memory.
+    The lines of a large range that are still read from a file are not counted.
+
+    Args:
+        edit (Edit) : The edit.
+    '''
+    return sum(sum(map(len, lines)) if isinstance(lines, list) else lines.memory() for lines in (edit.old, edit.new))
+
+def invert_edit(edit:Edit) -> Edit:
+    '''
+    Returns the edit that reverts the given edit.
+
+    Args:
+        edit (Edit) : The edit to revert.
+    '''
+    return Edit(edit.index, edit.new, edit.old)
+
+class History:
+    '''
+    Undo and redo stacks of the commands applied to a document.
+    The oldest commands are forgotten once either limit is exceeded.
+
+    Args:
+        max_depth (int)     : The maximum number of commands kept (default: 1000).
+        max_bytes (int)     : The maximum number of characters kept in the recorded edits (default: no limit).
+        journal (Journal)   : The journal every change to the document is appended to (default: None).
+                              A journal that cannot be written is dropped, and the error kept in journal_error.
+    '''
+    def __init__(self, max_depth:int=1000, max_bytes:int=None, journal=None):
+        self.max_depth = max_depth
+        self.max_bytes = max_bytes
+        self.journal = journal
+        self.journal_error = None   # the error that made the journal be dropped, until it is reported
+        self.listeners = []     # functions called with the edits of every command, undo and redo that changed the document
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self._size = 0          # characters held by the entries of both stacks
+        self._pending = None    # command currently being recorded
+        self.recorded = 0       # number of edits recorded so far, merged or not
+
+    def last_command(self) -> str:
+        '''
+        Returns the most recent command that can be undone ('' if there is none).
+        '''
+        return self.undo_stack[-1].command if self.undo_stack else ''
+
+    def begin(self, command:str, state:tuple) -> None:
+        '''
+        Starts recording the edits of a command.
+
+        Args:
+            command (str)   : The command as typed by the user.
+            state (tuple)   : The editor state before the command.
+        '''
+        self._pending = (command, [], state)
+
+    def record(self, edit:Edit) -> None:
+        '''
+        Adds an edit to the command being recorded, merged with the previous edit when possible.
+        The history takes ownership of the lists of lines of the edit.
+
+        Args:
+            edit (Edit) : The edit that was applied to the document.
+        '''
+        if self._pending:
+            self.recorded += 1
+            edits = self._pending[1]
+            if not edits or not merge_edits(edits[-1], edit):
+                edits.append(edit)
+
+    def commit(self, state:tuple, coalesce:bool=True) -> None:
+        '''
+        Finishes recording the current command.
+        Consecutive commands that only moved the cursors are merged into one entry.
+
+        Args:
+            state (tuple)   : The editor state after the command.
+            coalesce (bool) : Whether the command may be merged with other cursor-only commands.
+        '''
+        command, edits, before = self._pending
+        self._pending = None
+        cursor_only = coalesce and not edits
+        if cursor_only and self.undo_stack and self.undo_stack[-1].cursor_only:
+            self.undo_stack[-1] = self.undo_stack[-1]._replace(command=command, after=state)
+            return
+        if not cursor_only:     # a new change makes the undone commands unreachable
+            self._size -= sum(entry.size for entry in self.redo_stack)
+            self.redo_stack.clear()
+        size = sum(edit_size(edit) for edit in edits)
+        self.undo_stack.append(Entry(command, edits, before, state, cursor_only, size))
+        self._size += size
+        self._trim()
+        self._applied(edits, state)
+
+    def undo(self, buffer):
+        '''
+        Reverts the most recent command on the buffer.
+        Returns the editor state before that command, or None if there is nothing to undo.
+
+        Args:
+            buffer (LineBuffer) : The document.
+        '''
+        if not self.undo_stack:
+            return None
+        entry = self.undo_stack.pop()
+        edits = [invert_edit(edit) for edit in reversed(entry.edits)]
+        for edit in edits:
+            apply_edit(buffer, edit)
+        self.redo_stack.append(entry)
+        self._applied(edits, entry.before)
+        return entry.before
+
+    def redo(self, buffer):
+        '''
+        Re-applies the most recently undone command on the buffer.
+        Returns the editor state after that command, or None if there is nothing to redo.
+
+        Args:
+            buffer (LineBuffer) : The document.
+        '''
+        if not self.redo_stack:
+            return None
+        entry = self.redo_stack.pop()
+        for edit in entry.edits:
+            apply_edit(buffer, edit)
+        self.undo_stack.append(entry)
+        self._applied(entry.edits, entry.after)
+        return entry.after
+
+    def _applied(self, edits:list, state:tuple) -> None:
+        '''
+        Passes the edits a command, undo or redo applied to the document on to the journal and to the listeners.
+
+        Args:
+            edits (list)    : The edits, in the order they were applied.
+            state (tuple)   : The editor state after them.
+        '''
+        if edits:
+            if self.journal:
+                try:
+                    self.journal.append(edits, state)
+                except OSError as error:    # such as a directory that cannot be written: the edits go on without it
+                    self.drop_journal(error)
+            for listener in self.listeners:
+                listener(edits)
+
+    def drop_journal(self, error:OSError) -> None:
+        '''
+        Stops journaling the document after the journal failed, keeping its files as they are.
+
+        Args:
+            error (OSError) : The error of the journal.
+        '''
+        try:
+            self.journal.close(remove=False)
+        except OSError:
+            pass
+        self.journal = None
+        self.journal_error = error
+
+    def _trim(self) -> None:
+        '''
+        Forgets the oldest commands until both limits are respected.
+        The most recent command is always kept.
+        '''
+        while len(self.undo_stack) > 1 and (len(self.undo_stack) > self.max_depth or
+                                            (self.max_bytes is not None and self._size > self.max_bytes)):
+            self._size -= self.undo_stack.popleft().size
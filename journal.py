@@ -0,0 +1,274 @@
+'''
+Edit Journal
+
+Appends every change made to a document to a journal file next to it, so the
+unsaved work can be recovered after a crash. A change is journaled as the same
+edits the history records for undo, one line of JSON per command, and every
+line is flushed as soon as the command ends. Only the number of replaced lines
+is written, not the lines themselves, so deleting a large range costs a few
+bytes. A command putting a large range back, as undoing such a delete or
+pasting many lines does, writes out the lines of that range alone, a chunk at a
+time, without copying the rest of the document. Every few thousand
+commands, the document is written to a checkpoint file and the journal starts
+again from it, so recovering never replays more than the commands since the
+last checkpoint. Writing the document to its own file also starts the journal
+again, since the file then holds every change.
+
+The journal of "notes.txt" is ".notes.txt.journal", and its checkpoints are
+".notes.txt.<generation>.checkpoint", in the same directory.
+'''
+
+# import library
+import json
+import os
+from itertools import islice
+from buffer import PACK_SIZE, LineBuffer
+from fileio import open_file, save_file
+from history import Edit, apply_edit
+
+# number of commands or bytes journaled before the document is checkpointed
+CHECKPOINT_RECORDS = 10000
+CHECKPOINT_BYTES = 1 << 24
+
+def journal_path(path:str) -> str:
+    '''
+    Returns the path of the journal of a document: a hidden file next to it.
+
+    Args:
+        path (str)  : The path of the document.
+    '''
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, f'.{name}.journal')
+
+def file_stamp(path:str) -> list:
+    '''
+    Returns the size and modification time of a file, which tell whether it changed
+    ([] if it does not exist).
+
+    Args:
+        path (str)  : The path of the file.
+    '''
+    try:
+        status = os.stat(path)
+    except FileNotFoundError:
+        return []
+    return [status.st_size, status.st_mtime_ns]
+
+class Journal:
+    '''
+    The journal of the changes made to a document since it was last written or checkpointed.
+    The journal file is only created when the first change is appended, so opening a document
+    leaves the journal of an earlier session in place until the document is changed.
+
+    Args:
+        path (str)              : The path of the document.
+        buffer (LineBuffer)     : The document, written to the checkpoints.
+        max_records (int)       : The number of commands journaled before a checkpoint (default: CHECKPOINT_RECORDS).
+        max_bytes (int)         : The size of the journal that causes a checkpoint (default: CHECKPOINT_BYTES).
+    '''
+    def __init__(self, path:str, buffer:LineBuffer, max_records:int=CHECKPOINT_RECORDS, max_bytes:int=CHECKPOINT_BYTES):
+        self.path = os.path.abspath(path)
+        self.journal_path = journal_path(path)
+        self.buffer = buffer
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.header = {'base': self.path, 'stamp': file_stamp(self.path), 'generation': 0}
+        self.records = 0        # commands journaled since the header
+        self.appended = 0       # commands journaled since the journal was opened
+        self.first = 0          # number of the first command after the header
+        self._file = None       # the open journal (None: not created yet)
+
+    def exists(self) -> bool:
+        '''
+        Checks whether a journal file exists for the document.
+        '''
+        return os.path.exists(self.journal_path)
+
+    def checkpoint_path(self, generation:int) -> str:
+        '''
+        Returns the path of a checkpoint of the document.
+
+        Args:
+            generation (int)    : The number of the checkpoint.
+        '''
+        directory, name = os.path.split(self.path)
+        return os.path.join(directory, f'.{name}.{generation}.checkpoint')
+
+    def append(self, edits:list, state:tuple) -> None:
+        '''
+        Journals the edits made by one command and the cursors after it.
+
+        Args:
+            edits (list)    : The edits, in the order they were applied.
+            state (tuple)   : The editor state after the command; its cursors are journaled, not its registers.
+        '''
+        if self._file is None:
+            self._start()
+        if all(isinstance(edit.new, list) for edit in edits):
+            record = {'edits': [[edit.index, len(edit.old), edit.new] for edit in edits], 'cursor': list(state[:4])}
+            self._file.write(json.dumps(record, separators=(',', ':')).encode()+b'\n')
+        else:   # a large range put back: the same record, its lines written a chunk at a time
+            self._file.write(b'{"edits":[')
+            for number, edit in enumerate(edits):
+                self._file.write(f'{"," if number else ""}[{edit.index},{len(edit.old)},'.encode())
+                self._write_lines(edit.new)
+                self._file.write(b']')
+            self._file.write(f'],"cursor":{json.dumps(list(state[:4]), separators=(",", ":"))}}}\n'.encode())
+        self._file.flush()      # survives a crash of the editor
+        self.records += 1
+        self.appended += 1
+        if self.records >= self.max_records or self._file.tell() >= self.max_bytes:
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        '''
+        Writes the document to a new checkpoint and starts the journal again from it.
+        The journal is replaced only once the checkpoint is complete, and the previous
+        checkpoint is removed only once the journal is replaced, so a crash at any
+        moment leaves a journal that matches its checkpoint.
+        '''
+        previous = self.header.get('checkpoint')
+        generation = self.header['generation']+1
+        path = self.checkpoint_path(generation)
+        save_file(self.buffer, path)
+        self.header = {'base': self.path, 'checkpoint': os.path.basename(path), 'generation': generation}
+        self._start()
+        if previous:
+            self._remove(os.path.join(os.path.dirname(self.path), previous))
+
+    def rebase(self, position:tuple=None) -> None:
+        '''
+        Starts the journal again once the document was written to its file.
+        With a position, the commands journaled after it are kept, for a document
+        that kept changing while it was being written.
+
+        Args:
+            position (tuple)    : The position returned by position() when the written snapshot was taken
+                                  (default: every command is in the file).
+        '''
+        kept = b''
+        if position and self._file is not None:
+            generation, appended = position
+            if generation != self.header['generation']:     # checkpointed since: the journal does not depend on the file
+                return
+            self._file.flush()
+            with open(self.journal_path, 'rb') as file:
+                records = file.read().split(b'\n')[1:-1]   # the complete lines after the header
+            kept = b''.join(record+b'\n' for record in records[max(0, appended-self.first):])
+        previous = self.header.get('checkpoint')
+        self.header = {'base': self.path, 'stamp': file_stamp(self.path), 'generation': self.header['generation']}
+        if kept:
+            self._start(kept)
+        elif self._file is not None:    # created again with the next change
+            self._file.close()
+            self._file = None
+            self._remove(self.journal_path)
+        if previous:
+            self._remove(os.path.join(os.path.dirname(self.path), previous))
+
+    def position(self) -> tuple:
+        '''
+        Returns the number of commands journaled so far, to be given to rebase().
+        '''
+        return (self.header['generation'], self.appended)
+
+    def recover(self) -> tuple:
+        '''
+        Rebuilds the document from the journal: its file or checkpoint, then every journaled command.
+        A last command cut short by a crash is ignored. The journal then continues after the recovered commands.
+        Returns the recovered document and the state of the cursors after the last command.
+        Raises ValueError if the journal does not belong to the file as it is now.
+        '''
+        with open(self.journal_path, 'rb') as file:
+            data = file.read()
+        lines = data.split(b'\n')
+        try:
+            header = json.loads(lines[0])
+        except ValueError:
+            raise ValueError(f'"{self.journal_path}" is not a journal')
+        if 'checkpoint' in header:
+            buffer = open_file(os.path.join(os.path.dirname(self.path), header['checkpoint']))
+        elif header['stamp'] != file_stamp(self.path):
+            raise ValueError(f'"{self.path}" changed since the journal was written')
+        else:
+            buffer = open_file(self.path) if header['stamp'] else LineBuffer()
+        cursor, records, end = (0, False, 0, False), 0, len(lines[0])+1
+        for line in lines[1:-1]:    # the last piece follows the last complete line
+            try:
+                record = json.loads(line)
+            except ValueError:      # cut short by a crash
+                break
+            for index, count, new in record['edits']:
+                apply_edit(buffer, Edit(index, range(count), new))     # only the number of replaced lines is journaled
+            cursor, records, end = tuple(record['cursor']), records+1, end+len(line)+1
+        self.close(remove=False)
+        self.buffer, self.header, self.records, self.appended, self.first = buffer, header, records, records, 0
+        self._file = open(self.journal_path, 'r+b')
+        self._file.truncate(end)
+        self._file.seek(end)
+        return buffer, cursor
+
+    def close(self, remove:bool=True) -> None:
+        '''
+        Closes the journal, and removes it with its checkpoint when the changes are no longer needed.
+
+        Args:
+            remove (bool)   : Whether the journal and its checkpoint are removed (default: True).
+        '''
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            if remove:
+                self._remove(self.journal_path)
+                if 'checkpoint' in self.header:
+                    self._remove(os.path.join(os.path.dirname(self.path), self.header['checkpoint']))
+
+    def _start(self, records:bytes=b'') -> None:
+        '''
+        Replaces the journal file with a new one holding the header and the given records.
+        The new journal is written next to the old one and then renamed over it.
+
+        Args:
+            records (bytes) : The journaled commands to keep (default: none).
+        '''
+        temporary = self.journal_path+'.new'
+        with open(temporary, 'wb') as file:
+            file.write(json.dumps(self.header).encode()+b'\n'+records)
+            file.flush()
+            os.fsync(file.fileno())
+        if self._file is not None:
+            self._file.close()
+        os.replace(temporary, self.journal_path)
+        self._file = open(self.journal_path, 'ab')
+        self.records = records.count(b'\n')
+        self.first = self.appended-self.records
+
+    def _write_lines(self, lines) -> None:
+        '''
+        Writes lines to the journal as a JSON list, reading a large range from the document a chunk at a time.
+
+        Args:
+            lines (list)    : The lines, or a LineBuffer holding them.
+        '''
+        if isinstance(lines, list):
+            self._file.write(json.dumps(lines, separators=(',', ':')).encode())
+            return
+        self._file.write(b'[')
+        chunks, separator = lines.lines(), b''
+        chunk = list(islice(chunks, PACK_SIZE))
+        while chunk:
+            self._file.write(separator+json.dumps(chunk, separators=(',', ':'))[1:-1].encode())
+            chunk, separator = list(islice(chunks, PACK_SIZE)), b','
+        self._file.write(b']')
+
+    def _remove(self, path:str) -> None:
+        '''
+        Removes a file of the journal if it still exists.
+
+        Args:
+            path (str)  : The path of the file.
+        '''
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,148 @@
+'''
+Screen Rendering
+
+Draws only the window of the document that fits in the terminal, around the
+line cursor. On a terminal, every frame is compared with the previous one and
+only the rows that changed are redrawn, with the whole frame sent in a single
+write. Messages are shown on a status row under the window by the next frame,
+so printing them never scrolls the terminal under the rows already drawn.
+When the output is not a terminal, the window and the messages are printed as plain text.
+A deferred screen only draws the last frame it was asked for when it is flushed,
+so the commands run in between are displayed in a single frame.
+'''
+
+# import library
+import sys
+
+class Screen:
+    '''
+    A window of the document that follows the line cursor.
+
+    Args:
+        output (file)   : The stream the frames are written to (default: standard output).
+    '''
+    def __init__(self, output=None):
+        self.output = output
+        self.top = 0            # index of the first visible line
+        self._frame = None      # rows of the previous frame (None: the screen must be redrawn)
+        self.status = []        # messages waiting to be shown under the window
+
+    def invalidate(self) -> None:
+        '''
+        Forces the next frame to redraw every row, after something else was printed.
+        '''
+        self._frame = None
+
+    def message(self, content) -> None:
+        '''
+        Shows a message: on a terminal, on the status row of the next frame, otherwise printed at once.
+
+        Args:
+            content (object): The message.
+        '''
+        output = self.output or sys.stdout
+        if output.isatty():
+            self.status.append(str(content))
+        else:
+            print(content, file=output)
+
+    def print_status(self) -> None:
+        '''
+        Prints the messages no frame has shown, below whatever is on the terminal,
+        and forces the next frame to redraw every row.
+        '''
+        if self.status:
+            output = self.output or sys.stdout
+            output.write('\n'.join(self.status)+'\n')
+            output.flush()
+            self.status = []
+            self.invalidate()
+
+    def size(self) -> tuple:
+        '''
+        Returns the number of columns and rows available for the document.
+        Three rows are kept for the messages, the prompt and the echo of the user's input.
+        '''
+        import shutil   # only needed once a frame is drawn
+        columns, rows = shutil.get_terminal_size()
+        return max(1, columns-1), max(1, rows-3)
+
+    def scroll(self, line:int, line_count:int, height:int) -> None:
+        '''
+        Moves the window so that the given line is visible.
+
+        Args:
+            line (int)          : The index of the line that must be visible.
+            line_count (int)    : The number of lines in the document.
+            height (int)        : The number of visible lines.
+        '''
+        if line < self.top:
+            self.top = line
+        elif line >= self.top+height:
+            self.top = line-height+1
+        self.top = max(0, min(self.top, line_count-1))
+
+    def draw(self, buffer, line:int, draw_line) -> None:
+        '''
+        Draws the visible lines of the buffer.
+
+        Args:
+            buffer (LineBuffer) : The document.
+            line (int)          : The index of the line holding the cursor.
+            draw_line (function): Returns a line as displayed, given its content and its index.
+        '''
+        output = self.output or sys.stdout
+        terminal = output.isatty()
+        width, height = self.size()
+        width = width if terminal else None     # plain text is not cut to the terminal width
+        self.scroll(line, buffer.line_count(), height)
+        rows = [draw_line(content[:width], index)
+                for index, content in enumerate(buffer.lines(self.top, self.top+height), self.top)]
+        if not terminal:
+            output.write('\n'.join(rows)+'\n')
+            output.flush()
+            return
+        rows += ['']*(height-len(rows))
+        if self._frame is None or len(self._frame) != height:   # full redraw
+            parts = ['\033[H\033[2J']+[f'\033[{number+1};1H{row}' for number, row in enumerate(rows)]
+        else:   # only the rows that changed
+            parts = [f'\033[{number+1};1H\033[2K{row}' for number, row in enumerate(rows) if row != self._frame[number]]
+        status, self.status = '  '.join(self.status)[:width], []
+        parts.append(f'\033[{height+1};1H\033[J{status}\033[{height+2};1H')     # leave the cursor on the prompt row
+        self._frame = rows
+        output.write(''.join(parts))
+        output.flush()
+
+class DeferredScreen(Screen):
+    '''
+    A screen that keeps the last frame it is asked to draw until it is flushed.
+
+    Args:
+        output (file)   : The stream the frames are written to (default: standard output).
+    '''
+    def __init__(self, output=None):
+        super().__init__(output)
+        self._pending = None    # arguments of the frame waiting to be drawn
+
+    def draw(self, buffer, line:int, draw_line) -> None:
+        '''
+        Keeps the frame to be drawn by the next flush, replacing the frame waiting before.
+
+        Args:
+            buffer (LineBuffer) : The document.
+            line (int)          : The index of the line holding the cursor.
+            draw_line (function): Returns a line as displayed, given its content and its index.
+        '''
+        self._pending = (buffer, line, draw_line)
+
+    def flush(self) -> bool:
+        '''
+        Draws the waiting frame, if any, or prints the waiting messages when there is no frame to show them.
+        Returns whether a frame was drawn.
+        '''
+        if self._pending is None:
+            self.print_status()
+            return False
+        pending, self._pending = self._pending, None
+        super().draw(*pending)
+        return True
@@ -0,0 +1,360 @@
+'''
+Editing Server
+
+Keeps documents open in a resident process and runs the commands other programs
+send over a local socket (a Unix socket, or TCP on localhost), so that an edit
+costs neither starting Python nor reading the file again. The server holds a
+pool of named sessions, each with its own documents, and runs the commands of a
+session one at a time, in the order they arrived, while other sessions go on.
+A client may send many requests without waiting for the answers; every answer
+carries the id of its request. A request longer than the limit of the server
+is answered with an error, carrying its id when "id" comes first in it.
+
+Requests and answers are JSON objects, one per line. A request names its session
+(created on first use) and asks for one of:
+- "command": a command exactly as typed at the prompt, such as "dd" or ":%s/a/b/g";
+- "open": the path of a file to open in the session;
+- "lines": [start, stop], the lines of the document between two indices;
+- "close": true, to close the session.
+The answer to a command holds the changes it made rather than the whole text:
+"changes" is a list of [index, deleted, inserted], where "deleted" lines starting
+at "index" were replaced with the "inserted" lines, to apply in order. When the
+command replaced the document (such as :e, :bn or :recover), "reset" is true and
+the lines must be read again. Every answer also holds "ok", "cursor" (line, row),
+"lines" (the number of lines), "messages", and "error" when "ok" is false.
+
+Usage:
+    python server.py [--unix PATH | --port PORT] [--max-sessions N] [--max-line BYTES]
+'''
+
+# import library
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+from buffer import LineBuffer
+from session import Session
+
+# number of requests of one connection that may run at once, before the server stops reading it
+MAX_PENDING = 256
+# largest request or answer, in bytes: the lines of a document travel inside them
+MAX_LINE = 1 << 26
+# the id at the start of a request, found without parsing a request that is too long
+leading_id = re.compile(rb'\s*\{\s*"id"\s*:\s*(-?\d+|"(?:[^"\\]|\\.)*"|null)')
+
+class ServerSession(Session):
+    '''
+    A session driven by a client: nothing is displayed, and the messages are kept for the answer.
+    '''
+    def __init__(self):
+        super().__init__(quiet=True)
+        self.messages = []      # messages of the request being answered
+
+    def message(self, content) -> None:
+        '''
+        Keeps a message for the answer to the request being run.
+
+        Args:
+            content (object): The message.
+        '''
+        self.messages.append(str(content))
+
+class EditServer:
+    '''
+    Runs the requests of the clients on a pool of named sessions.
+
+    Args:
+        max_sessions (int)  : The maximum number of sessions open at once (default: 64).
+        max_line (int)      : The size of the longest request read, in bytes (default: MAX_LINE).
+    '''
+    def __init__(self, max_sessions:int=64, max_line:int=MAX_LINE):
+        self.max_sessions = max_sessions
+        self.max_line = max_line
+        self.sessions = {}      # name -> session
+        self.locks = {}         # name -> lock held while a request of the session runs
+
+    async def handle_client(self, reader, writer) -> None:
+        '''
+        Reads the requests of a connection and answers each of them as soon as it is done.
+        A request longer than max_line is skipped and answered with an error.
+
+        Args:
+            reader (StreamReader)   : The stream of requests, read with max_line as its limit.
+            writer (StreamWriter)   : The stream of answers.
+        '''
+        pending, writing = asyncio.Semaphore(MAX_PENDING), asyncio.Lock()
+        tasks = set()
+        overrun = None      # while a request that is too long is skipped: its id, if found
+        try:
+            while True:
+                try:
+                    line = await reader.readuntil(b'\n')
+                except asyncio.IncompleteReadError as error:    # the last request has no line break
+                    line = error.partial
+                except asyncio.LimitOverrunError as error:
+                    piece = await reader.readexactly(error.consumed)   # skipped piece by piece, up to its line break
+                    if overrun is None:
+                        match = leading_id.match(piece)
+                        overrun = (json.loads(match.group(1)) if match else None,)
+                    continue
+                if overrun is not None:
+                    await self.send({'id': overrun[0], 'ok': False, 'error': f'Request longer than {self.max_line} bytes'},
+                                    writer, writing)
+                    overrun = None
+                    continue
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                await pending.acquire()
+                task = asyncio.create_task(self.answer(line, writer, writing))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda task: pending.release())
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def answer(self, line:bytes, writer, writing:asyncio.Lock) -> None:
+        '''
+        Runs one request and writes its answer.
+
+        Args:
+            line (bytes)            : The request, as received.
+            writer (StreamWriter)   : The stream of answers.
+            writing (Lock)          : Held while an answer of the connection is written.
+        '''
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('A request must be a JSON object')
+        except ValueError as error:
+            reply = {'id': None, 'ok': False, 'error': f'Invalid request: {error}'}
+        else:
+            reply = await self.run_request(request)
+        await self.send(reply, writer, writing)
+
+    async def send(self, reply:dict, writer, writing:asyncio.Lock) -> None:
+        '''
+        Writes an answer.
+
+        Args:
+            reply (dict)            : The answer.
+            writer (StreamWriter)   : The stream of answers.
+            writing (Lock)          : Held while an answer of the connection is written.
+        '''
+        async with writing:
+            writer.write(json.dumps(reply).encode()+b'\n')
+            await writer.drain()
+
+    async def run_request(self, request:dict) -> dict:
+        '''
+        Runs a request on its session, once the requests of the session received before it are done.
+        Returns the answer.
+
+        Args:
+            request (dict)  : The request.
+        '''
+        name = str(request.get('session', 'default'))
+        if name not in self.sessions:
+            if 'close' in request:
+                return {'id': request.get('id'), 'ok': False, 'error': f'No session: {name}'}
+            if len(self.sessions) >= self.max_sessions:
+                return {'id': request.get('id'), 'ok': False, 'error': 'Too many sessions'}
+            self.sessions[name], self.locks[name] = ServerSession(), asyncio.Lock()
+        async with self.locks[name]:
+            session = self.sessions.get(name)
+            if session is None:     # closed by an earlier request
+                return {'id': request.get('id'), 'ok': False, 'error': f'No session: {name}'}
+            try:
+                reply = await self.run_session(session, request)
+            except Exception as error:
+                reply = {'ok': False, 'error': f'{type(error).__name__}: {error}'}
+            reply.update(id=request.get('id'), messages=session.messages,
+                         cursor=[session.line_curs_pos, session.row_curs_pos], lines=session.buffer.line_count())
+            session.messages = []
+            if reply.pop('closed', False):
+                session.close()
+                del self.sessions[name], self.locks[name]
+            return reply
+
+    async def run_session(self, session:ServerSession, request:dict) -> dict:
+        '''
+        Runs a request on a session and returns the answer, without the fields every answer has.
+        Commands starting with ":" may read or write files, so they run in a worker thread.
+
+        Args:
+            session (ServerSession) : The session of the request.
+            request (dict)          : The request.
+        '''
+        if 'command' in request:
+            command, buffer, history, changes = str(request['command']), session.buffer, session.history, []
+            history.listeners.append(changes.extend)
+            try:
+                if command.startswith(':'):
+                    running = await asyncio.to_thread(session.run, command)
+                else:
+                    running = session.run(command)
+            finally:
+                history.listeners.remove(changes.extend)
+            if session.buffer is not buffer:
+                return {'ok': True, 'reset': True, 'closed': not running}
+            return {'ok': True, 'changes': [[edit.index, len(edit.old), list(edit.new.lines() if isinstance(edit.new, LineBuffer) else edit.new)]
+                                            for edit in changes], 'closed': not running}
+        if 'open' in request:
+            await asyncio.to_thread(session.open_document, str(request['open']))
+            return {'ok': True, 'reset': True}
+        if 'lines' in request:
+            start, stop = request['lines']
+            return {'ok': True, 'text': list(session.buffer.lines(max(0, int(start)), int(stop)))}
+        if request.get('close'):
+            return {'ok': True, 'closed': True}
+        return {'ok': False, 'error': 'A request needs "command", "open", "lines" or "close"'}
+
+    def close(self) -> None:
+        '''
+        Closes every session.
+        '''
+        for session in self.sessions.values():
+            session.close()
+        self.sessions.clear()
+        self.locks.clear()
+
+class Client:
+    '''
+    A connection to an editing server, for tools written in Python.
+    Requests may be sent without waiting for the answers of the earlier ones.
+
+    Args:
+        reader (StreamReader)   : The stream of answers.
+        writer (StreamWriter)   : The stream of requests.
+    '''
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+        self.waiting = {}       # id -> future of the answer
+        self.receiving = asyncio.create_task(self.receive())
+
+    @classmethod
+    async def connect(cls, unix:str=None, port:int=None, limit:int=MAX_LINE):
+        '''
+        Returns a client connected to a server on a Unix socket or on a TCP port of localhost.
+
+        Args:
+            unix (str)  : The path of the Unix socket.
+            port (int)  : The TCP port, when there is no Unix socket.
+            limit (int) : The size of the longest answer read, in bytes (default: MAX_LINE).
+        '''
+        if unix:
+            reader, writer = await asyncio.open_unix_connection(unix, limit=limit)
+        else:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port, limit=limit)
+        return cls(reader, writer)
+
+    def send(self, **request) -> asyncio.Future:
+        '''
+        Sends a request and returns the future of its answer.
+
+        Args:
+            request (dict)  : The fields of the request, such as session="a", command="dd".
+        '''
+        if self.receiving.done():
+            raise ConnectionError('The connection is closed')
+        self.next_id += 1
+        request = {'id': self.next_id, **request}  # first, so that even a request too long is answered with it
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[self.next_id] = future
+        self.writer.write(json.dumps(request).encode()+b'\n')
+        return future
+
+    async def request(self, **request) -> dict:
+        '''
+        Sends a request and returns its answer.
+
+        Args:
+            request (dict)  : The fields of the request, such as session="a", command="dd".
+        '''
+        future = self.send(**request)
+        await self.writer.drain()
+        return await future
+
+    async def receive(self) -> None:
+        '''
+        Hands every answer to the future of its request, until the connection ends or fails,
+        as it does on an answer longer than its limit. The requests still waiting then fail.
+        '''
+        error = ConnectionError('The server closed the connection')
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                reply = json.loads(line)
+                future = self.waiting.pop(reply.get('id'), None)
+                if future and not future.done():
+                    future.set_result(reply)
+        except (OSError, ValueError) as exception:     # ValueError: a line too long, or not JSON
+            error = ConnectionError(f'The connection failed: {exception}')
+        finally:
+            for future in self.waiting.values():
+                if not future.done():
+                    future.set_exception(error)
+            self.waiting.clear()
+
+    async def close(self) -> None:
+        '''
+        Closes the connection.
+        '''
+        self.writer.close()
+        await self.writer.wait_closed()
+        await self.receiving
+
+async def serve(server:EditServer, unix:str=None, port:int=8765) -> None:
+    '''
+    Serves the clients until the program is interrupted.
+
+    Args:
+        server (EditServer) : The server.
+        unix (str)          : The path of the Unix socket to listen on (default: TCP instead).
+        port (int)          : The TCP port of localhost to listen on (default: 8765).
+    '''
+    if unix:
+        listener = await asyncio.start_unix_server(server.handle_client, unix, limit=server.max_line)
+    else:
+        listener = await asyncio.start_server(server.handle_client, '127.0.0.1', port, limit=server.max_line)
+    print(f'Listening on {unix or f"127.0.0.1:{port}"}', file=sys.stderr)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+        if unix and os.path.exists(unix):
+            os.remove(unix)
+
+def main(argv:list=None) -> int:
+    '''
+    Runs the editing server from the command line.
+    Returns the exit status of the program.
+
+    Args:
+        argv (list) : The command line arguments (default: sys.argv[1:]).
+    '''
+    parser = argparse.ArgumentParser(description='Serve editing sessions to local clients.')
+    address = parser.add_mutually_exclusive_group()
+    address.add_argument('--unix', metavar='PATH', help='Unix socket to listen on')
+    address.add_argument('--port', type=int, default=8765, help='TCP port of localhost to listen on (default: 8765)')
+    parser.add_argument('--max-sessions', type=int, default=64, help='maximum number of open sessions (default: 64)')
+    parser.add_argument('--max-line', type=int, default=MAX_LINE, help=f'size of the longest request in bytes (default: {MAX_LINE})')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(EditServer(args.max_sessions, args.max_line), args.unix, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1337 @@
+'''
+Editing Session
+
+The documents being edited, with their cursors and history, the registers they
+share, and the commands run on them. The subsystems only some commands need are
+imported by those commands the first time they run: reading and writing files,
+the journal, statistics and highlighting. A session therefore starts with the
+command parser, the buffer, the history and the screen only.
+'''
+
+# import library
+import os
+import re
+import string
+import time
+from bisect import bisect_left
+from collections import namedtuple
+from functools import lru_cache
+from buffer import BLOCK_SIZE, PACK_SIZE, LineBuffer
+from render import Screen
+from history import Edit, History, apply_edit
+
+# initialize global variables
+history_depth = 1000        # maximum number of commands that can be undone
+history_memory = 2**26      # maximum number of characters kept for undo
+space = re.compile(r'\s')         # a single space, tab or line break
+spaces = re.compile(r'\s+')       # a run of them
+ex_command = re.compile(r':([%0-9.$,]*)([a-z]+)\s*(.*)', re.DOTALL)     # :[range]command[argument]
+register_prefix = re.compile(r'"([a-z"])(.+)', re.DOTALL)   # a command using a named register, as in "ayy
+count_prefix = re.compile(r'([1-9][0-9]*)(\D.*)', re.DOTALL)     # a command repeated a number of times, as in 10dd
+word_lines = 64             # maximum number of lines whose word boundaries are kept
+help_message = '''? - display this help info
+. - toggle row curs on and off
+; - toggle line curs on and off
+h - move curs left
+j - move curs up
+k - move curs down
+l - move curs right
+^ - move curs to beginning of the line
+$ - move curs to end of the line
+w - move curs to beginning of next word
+b - move curs to beginning of previous word
+i - insert <text> before curs
+a - append <text> after curs
+x - delete character at curs
+dw - delete word and trailing spaces at curs
+yy - copy current line to memory
+p - paste copied line(s) below line curs
+P - paste copied line(s) above line curs
+"<a-z><command> - copy to or paste from a named register, as in "ayy, "a5yy or "ap
+:[range]y [a-z] - copy the lines of range to a register
+dd - delete line
+:[range]d - delete the lines of range
+o - insert empty line below
+O - insert empty line above
+<count><command> - repeat a command as one command, as in 10dd, 50x, 3p or 100r
+/<pattern> - move curs to next match of a regular expression
+n - move curs to next match
+N - move curs to previous match
+:[range]s/<pattern>/<replacement>/[gi] - replace matches in the lines of range (%, N or N,M; default: current line)
+u - undo previous command
+U - redo previously undone command
+r - repeat last command
+s - show content
+:e <path> - open file in a new buffer, or switch to the buffer holding it
+:e! [path] - read the file being edited again, discarding its unsaved changes
+:bn - switch to next buffer
+:bp - switch to previous buffer
+:ls - list buffers
+:[range]w [path] - write content, or the lines of range, to file
+:recover - restore the changes journaled by an editor that crashed
+:stats [on|mem|profile|off|reset|csv <path>|prof <path>] - show or record the cost of every command
+:syntax [on|off|<language>] - color code and configuration files, by their extension or in a language
+q - quit program'''
+
+# helper functions
+def count_space_after(content:str, row_curs_pos:int) -> int:
+    '''
+    Counts spaces after row cursor.
+
+    Args:
+        content (str)       : The text.
+        row_curs_pos (int)  : The index of the row cursor.
+    '''
+    match = spaces.match(content, row_curs_pos)    # matched in place, without copying the rest of the line
+    if not match:
+        return 0
+    return len(match.group())
+
+def count_space_before(content:str, row_curs_pos:int) -> int:
+    '''
+    Counts spaces before row cursor.
+
+    Args:
+        content (str)       : The text.
+        row_curs_pos (int)  : The index of the row cursor.
+    '''
+    count = 2
+    if content[row_curs_pos].isspace():    # if the cursor is at a space
+        i = row_curs_pos - 1 
+    else:
+        i = row_curs_pos-2
+    while i >= 0 and content[i].isspace():
+        count += 1
+        i -= 1
+    return count
+
+def word_boundaries(content:str) -> tuple:
+    '''
+    Returns the sorted indices of the spaces in a line, with both endpoints of the line.
+
+    Args:
+        content (str)   : The text of the line.
+    '''
+    return (0, *[match.start() for match in space.finditer(content)], len(content))
+
+def split_count(user_input:str) -> tuple:
+    '''
+    Splits the count in front of a command, as in "10dd", from the command.
+    Returns the count (None if there is none) and the command.
+
+    Args:
+        user_input (str)    : The input of the user.
+    '''
+    match = count_prefix.match(user_input)
+    if not match:
+        return None, user_input
+    return int(match.group(1)), match.group(2)
+
+def split_register(user_input:str) -> tuple:
+    '''
+    Splits the register in front of a command, as in '"ayy', from the command.
+    Returns the name of the register ('"': the unnamed register) and the command.
+
+    Args:
+        user_input (str)    : The input of the user.
+    '''
+    match = register_prefix.match(user_input)
+    if not match:
+        return '"', user_input
+    return match.group(1), match.group(2)
+
+def is_repeatable(user_input:str) -> bool:
+    '''
+    Checks whether a command can be repeated with "r".
+
+    Args:
+        user_input (str)    : The command, with or without a count.
+    '''
+    user_input = split_count(user_input)[1]
+    return user_input[:1] in ['i', 'a'] or user_input in ['.', 'h', 'l', '^', '$', 'w', 'b', 'x', 'dw', 's']
+
+@lru_cache(maxsize=64)
+def compile_pattern(pattern:str, flags:int=0) -> re.Pattern:
+    '''
+    Returns a compiled regular expression, kept for the next searches and substitutions with the same pattern.
+
+    Args:
+        pattern (str)   : The regular expression.
+        flags (int)     : The flags of the regular expression (default: 0).
+    '''
+    return re.compile(pattern, flags)
+
+def parse_range(text:str, current:int, line_count:int) -> tuple:
+    '''
+    Returns the first line and the line after the last line of a range such as "%", "3", "3,10", ".,$".
+    Lines are numbered from 1, "." is the current line and "$" the last line.
+    Raises ValueError if the range is not valid.
+
+    Args:
+        text (str)          : The range (''; the current line).
+        current (int)       : The index of the current line.
+        line_count (int)    : The number of lines in the document.
+    '''
+    if text == '%':
+        return 0, line_count
+    addresses = text.split(',')
+    if len(addresses) > 2 or not all(address.isdigit() or address in ['', '.', '$'] for address in addresses):
+        raise ValueError(f'Invalid range: {text}')
+    addresses = [current+1 if address in ['', '.'] else line_count if address == '$' else int(address) for address in addresses]
+    first, last = addresses[0], addresses[-1]
+    if not 1 <= first <= last <= line_count:
+        raise ValueError(f'Invalid range: {text}')
+    return first-1, last
+
+def split_substitution(text:str) -> tuple:
+    '''
+    Splits "/pattern/replacement/flags" into its parts.
+    The first character is the delimiter, which can appear escaped with a backslash in the pattern and replacement.
+
+    Args:
+        text (str)  : The substitution, starting with the delimiter.
+    '''
+    delimiter, parts, part, i = text[0], [], '', 1
+    while i < len(text):
+        if text[i] == '\\' and text[i+1:i+2] == delimiter:
+            part += delimiter
+            i += 2
+            continue
+        if text[i] == delimiter and len(parts) < 2:
+            parts.append(part)
+            part = ''
+        else:
+            part += text[i]
+        i += 1
+    parts.append(part)
+    return tuple(parts+['']*(3-len(parts)))
+
+def parse_command(user_input:str) -> tuple:
+    '''
+    Splits the user's input into the command and the list of its arguments.
+
+    Args:
+        user_input (str)    : The input of the user.
+    '''
+    if user_input[0] in ['i', 'a', '/']:     # text typed right after the command
+        return user_input[0], [user_input[1:]]
+    match = ex_command.fullmatch(user_input)
+    if match and ':'+match.group(2) in ranged_commands:     # command line commands taking a range typed before them
+        return ':'+match.group(2), [match.group(1), match.group(3)]
+    if user_input[0] == ':':    # command line commands, separated from their argument by a space
+        command, _, argument = user_input.partition(' ')
+        return command, [argument.strip()] if argument.strip() else []
+    return user_input, []
+
+class LineWords:
+    '''
+    The word boundaries of the lines the cursor moved over, by line index, so the next motions on a long line
+    only search its boundaries. The lines follow the edits of the document reported by its history: those
+    after an edit are moved along with it, and the edited ones are forgotten. The edits of a command are only
+    reported once it ends, so while it is still changing the document, the line it moves over is kept apart.
+
+    Args:
+        buffer (LineBuffer) : The document.
+        history (History)   : The history of the document, which passes on its edits.
+        size (int)          : The maximum number of lines kept (default: word_lines).
+    '''
+    def __init__(self, buffer, history, size:int=word_lines):
+        self.buffer = buffer
+        self.history = history
+        self.size = size
+        self.lines = {}     # index -> content and word boundaries of the line, the oldest first
+        self.version = buffer.version   # version of the buffer the kept lines were read from
+        self._changing = (None, None, '', ())   # version, index, content and word boundaries of the line a command is changing
+        history.listeners.append(self.edited)
+
+    def close(self) -> None:
+        '''
+        Stops following the edits of the document.
+        '''
+        self.history.listeners.remove(self.edited)
+
+    def get(self, index:int) -> tuple:
+        '''
+        Returns the content of a line and its word boundaries (see word_boundaries), reading the line if it is not kept.
+
+        Args:
+            index (int) : The index of the line.
+        '''
+        if self.buffer.version != self.version:     # changed by a command that is still running
+            if self._changing[:2] != (self.buffer.version, index):
+                content = self.buffer.load_line(index)
+                self._changing = (self.buffer.version, index, content, word_boundaries(content))
+            return self._changing[2:]
+        words = self.lines.get(index)
+        if words is None:
+            content = self.buffer.load_line(index)
+            words = self.keep(index, content, word_boundaries(content))
+        return words
+
+    def keep(self, index:int, content:str, boundaries:tuple) -> tuple:
+        '''
+        Keeps the word boundaries of a line, forgetting the oldest line when there are too many.
+        Returns the content and the word boundaries.
+
+        Args:
+            index (int)         : The index of the line.
+            content (str)       : The content of the line.
+            boundaries (tuple)  : Its word boundaries.
+        '''
+        if index not in self.lines and len(self.lines) >= self.size:
+            del self.lines[next(iter(self.lines))]
+        self.lines[index] = (content, boundaries)
+        return self.lines[index]
+
+    def replaced(self, index:int, content:str, boundaries:tuple) -> None:
+        '''
+        Sets the new content of a line a command just changed and its word boundaries, found from the
+        boundaries before the change, so the next repetition of the command does not search the line again.
+
+        Args:
+            index (int)         : The index of the line.
+            content (str)       : The new content of the line.
+            boundaries (tuple)  : Its word boundaries.
+        '''
+        if self.buffer.version != self.version:
+            self._changing = (self.buffer.version, index, content, boundaries)
+        else:
+            self.keep(index, content, boundaries)
+
+    def edited(self, edits:list) -> None:
+        '''
+        Moves the kept lines along with the lines edited and forgets the edited ones.
+        The line kept apart while the command ran becomes one of them, if it was read after its last edit.
+
+        Args:
+            edits (list)    : The edits, in the order they were applied.
+        '''
+        for index, old, new in edits:
+            end, shift = index+len(old), len(new)-len(old)
+            self.lines = {line if line < index else line+shift: words for line, words in self.lines.items()
+                          if not index <= line < end}
+        self.version = self.buffer.version
+        version, index, content, boundaries = self._changing
+        if version == self.version:
+            self.keep(index, content, boundaries)
+        self._changing = (None, None, '', ())
+
+# a document of a session that is not the one being edited: its lines, history, file, cursors, scroll position,
+# the version of its lines when they were last read from or written to the file, and its highlighter
+Document = namedtuple('Document', ['buffer', 'history', 'file_path', 'row_curs_pos', 'line_curs_pos', 'top', 'written_version',
+                                   'highlighter'])
+
+class Session:
+    '''
+    The state of the documents being edited: their lines, cursors and history, and the registers they share.
+    One document is edited at a time; the others are kept aside as they were left.
+    Every session is independent, so several sets of documents can be edited in the same process.
+
+    Args:
+        quiet (bool)    : Whether nothing is displayed, as in batch mode (default: False).
+                          A session that is not quiet journals the changes of a document with a file.
+    '''
+    def __init__(self, quiet:bool=False):
+        self.buffer = LineBuffer()  # the document, stored line by line
+        self.row_curs_on = False
+        self.line_curs_on = False
+        self.row_curs_pos = 0       # index of character in a row
+        self.line_curs_pos = 0      # index of line
+        self.registers = {'"': ['']}    # register name -> copied lines, replaced as a whole whenever a register changes
+        self.register = '"'         # the register used by the command being run
+        self.file_path = ''         # path of the file being edited
+        self.written_version = 0    # version of the buffer when it was last read from or written to the file
+        self.screen = Screen()      # the window of the document shown after every command
+        self.quiet = quiet
+        self.journaled = not quiet  # whether the changes are journaled for crash recovery
+        self.history = History(history_depth, history_memory)
+        self.stats = None           # cost of every command, recorded once turned on with :stats
+        self.search_pattern = ''    # the last pattern searched for
+        self.words = None           # the word boundaries of the lines of the document being edited, once the cursor moved by words
+        self.syntax = ''            # '' (no highlighting), 'on' (by the extension of the file) or a language
+        self.highlighter = None     # the highlighter of the document being edited, once it was drawn highlighted
+        self.documents = [None]     # every open document, the one being edited kept in the session itself
+        self.current = 0            # the number of the document being edited
+
+    def document_is(self, content:str) -> bool:
+        '''
+        Checks whether the whole document consists of a single line equal to content.
+
+        Args:
+            content (str)   : The expected content of the document.
+        '''
+        return self.buffer.line_count() == 1 and self.buffer.get_line(0) == content
+
+    def save_state(self) -> tuple:
+        '''
+        Returns the cursor and register state of the editor.
+        '''
+        return (self.row_curs_pos, self.row_curs_on, self.line_curs_pos, self.line_curs_on, self.registers)
+
+    def restore_state(self, state:tuple, left:tuple=None) -> None:
+        '''
+        Restores the cursor and register state of the editor.
+        The registers are shared by every document, so when undo or redo gives the state the command left,
+        they are only restored if no later command, in this document or another one, has replaced them since.
+
+        Args:
+            state (tuple)   : The state returned by save_state.
+            left (tuple)    : The state the undone or redone command left (default: the registers are restored).
+        '''
+        if left is not None and self.registers is not left[4]:
+            state = state[:4]+(self.registers,)
+        self.row_curs_pos, self.row_curs_on, self.line_curs_pos, self.line_curs_on, self.registers = state
+
+    def replace_lines(self, index:int, count:int, lines:list) -> None:
+        '''
+        Replaces a number of lines of the document and records the edit for undo.
+        A large range is moved out of the document into the edit without being read, and
+        large new lines are recorded as the range of the document holding them once packed,
+        so the edit does not keep a second copy of them.
+
+        Args:
+            index (int)     : The index of the first replaced line.
+            count (int)     : The number of lines to replace (0: only insert).
+            lines (list)    : The new lines, or a LineBuffer holding them.
+        '''
+        if count < BLOCK_SIZE and isinstance(lines, list) and len(lines) < BLOCK_SIZE:
+            edit = Edit(index, list(self.buffer.lines(index, index+count)), list(lines))
+            if edit.old == edit.new:
+                return
+            apply_edit(self.buffer, edit)
+        else:
+            old = self.buffer.delete(index, count)
+            if count < BLOCK_SIZE:      # a few lines are kept as a list, like the lines of a small edit
+                old = list(old.lines())
+            self.buffer.insert(index, lines)
+            new = list(lines) if isinstance(lines, list) and len(lines) < BLOCK_SIZE else self.buffer.snapshot(index, index+len(lines))
+            edit = Edit(index, old, new)
+        self.history.record(edit)
+
+    def run(self, user_input:str) -> bool:
+        '''
+        Executes the user's input, recording what it cost when statistics are on.
+        Returns False if the user inputs the character to quit the program, otherwise True.
+
+        Args:
+            user_input (str)    : The input of the user.
+        '''
+        if self.stats is not None and not self.stats.active:
+            return self.stats.measure(self, user_input)
+        return self.execute(user_input)
+
+    def execute(self, user_input:str) -> bool:
+        '''
+        Executes another function according to the user's input.
+        If the user's input is out of the scope of the options, this function will do nothing.
+        A command with a count runs that many times as a single command: one history entry and one display.
+        Returns False if the user inputs the character to quit the program, otherwise True.
+
+        Args:
+            user_input (str)    : The input of the user.
+        '''
+        # execute command
+        if user_input == 'q':
+            return False
+        else:
+            register, plain_input = split_register(user_input)
+            count, plain_input = split_count(plain_input)
+            if count and plain_input == 'r' and is_repeatable(self.history.last_command()):     # the last command, counted
+                plain_input = split_count(self.history.last_command())[1]
+                user_input = f'{count}{plain_input}'
+            if plain_input in ['', 'i', 'a'] or (plain_input == 'r' and not self.history.last_command()):
+                pass
+            elif parse_command(plain_input)[0] in options:
+                command, argument = parse_command(plain_input)
+                if command in ['?', 'u', 'U', 'r', 's', ':e', ':e!', ':w', ':recover', ':stats', ':syntax', ':bn', ':bp', ':ls']:
+                    if (count or register != '"') and command != 'r':   # only commands that can be undone take a count or register
+                        return True
+                    options[command](self, *argument)
+                    if command in ['?', 's', ':e', ':e!', ':w', ':recover', ':stats', ':syntax', ':ls']:   # printed over the window
+                        self.print_messages()
+                else:
+                    previous_command, previous_registers, previous_line_count = self.history.last_command(), self.registers, self.buffer.line_count()
+                    start = time.perf_counter()
+                    self.history.begin(user_input, self.save_state())
+                    self.account('history', start)
+                    self.register = register
+                    try:
+                        if count and command in batched_commands:
+                            options[command](self, *argument, count)
+                        else:
+                            for repetition in range(count or 1):
+                                recorded, state = self.history.recorded, self.save_state()
+                                options[command](self, *argument)
+                                if self.history.recorded == recorded and self.save_state() == state:    # nothing left to change
+                                    break
+                    finally:
+                        self.register = '"'
+                    start = time.perf_counter()
+                    self.history.commit(self.save_state(), coalesce=self.registers is previous_registers)
+                    self.account('history', start)
+                    self.report_journal()
+                    # show text
+                    if (plain_input == '.' and self.document_is('')) or (plain_input == 'dd' and previous_line_count == 1) or (plain_input==';' and self.line_curs_on and self.document_is('') and previous_command in ['.', '']):
+                        self.print_messages()
+                    else:
+                        self.show()
+            return True
+
+    # cursor display functions
+    def draw_curs(self, line:str, index:int) -> str:
+        '''
+        Returns the line as it is displayed, with the enabled cursors drawn on it, and colored when highlighting is on.
+        The cursors and colors are never stored in the document itself.
+
+        Args:
+            line (str)  : The content of the line.
+            index (int) : The index of the line.
+        '''
+        cursor = min(self.row_curs_pos, len(line)-1) if index == self.line_curs_pos and self.row_curs_on and line else None
+        highlighter = self.current_highlighter()
+        if highlighter:
+            line = highlighter.paint(line, index, cursor)
+        elif cursor is not None:
+            line = line[:cursor]+'\033[42m'+line[cursor]+'\033[0m'+line[cursor+1:]
+        if index == self.line_curs_pos:
+            return '*'+line if self.line_curs_on else line
+        return ' '+line if self.line_curs_on else line
+
+    def current_highlighter(self) -> 'Highlighter':
+        '''
+        Returns the highlighter of the document being edited, or None if highlighting is off.
+        Every document keeps its own highlighter, so switching documents keeps the lexer states of each;
+        it is only made again when the lines of the document are replaced, or its language changes.
+        '''
+        if not self.syntax:
+            return None
+        from highlight import LANGUAGES, Highlighter, language_for
+        highlighter, language = self.highlighter, self.syntax if self.syntax in LANGUAGES else language_for(self.file_path)
+        if highlighter is None or highlighter.buffer is not self.buffer or highlighter.history is not self.history or \
+           highlighter.language != language:
+            if highlighter:
+                highlighter.close()
+            self.highlighter = highlighter = Highlighter(language, self.buffer, self.history)
+        return highlighter
+
+    def render(self) -> str:
+        '''
+        Returns the whole document as it is displayed, with the enabled cursors drawn on it.
+        '''
+        highlighter = self.current_highlighter()
+        if highlighter:
+            highlighter.new_frame(None)     # every line is shown
+        return '\n'.join(self.draw_curs(line, index) for index, line in enumerate(self.buffer.lines()))
+
+    def show(self) -> None:
+        '''
+        Displays the window of the document around the line cursor.
+        '''
+        if not self.quiet:
+            start = time.perf_counter()
+            highlighter = self.current_highlighter()
+            if highlighter:
+                highlighter.new_frame()
+            self.screen.draw(self.buffer, self.line_curs_pos, self.draw_curs)
+            self.account('render', start)
+
+    def message(self, content) -> None:
+        '''
+        Shows a message to the user under the window, unless the editor runs quietly.
+
+        Args:
+            content (object): The message.
+        '''
+        if not self.quiet:
+            self.screen.message(content)
+
+    def print_messages(self) -> None:
+        '''
+        Prints the messages of a command that draws no frame, over the window, which is then redrawn by the next frame.
+        '''
+        if not self.quiet:
+            self.screen.print_status()
+            self.screen.invalidate()
+
+    def report_journal(self) -> None:
+        '''
+        Tells the user once that the changes of the document are no longer journaled, because the journal failed.
+        '''
+        error, self.history.journal_error = self.history.journal_error, None
+        if error:
+            self.message(f'Journal off for this document, changes cannot be recovered after a crash: {error}')
+
+    def account(self, section:str, start:float) -> None:
+        '''
+        Adds the time since "start" to a section of the command being measured, when statistics are on.
+
+        Args:
+            section (str)   : The name of the section ('render' or 'history').
+            start (float)   : The time the section started, from time.perf_counter().
+        '''
+        if self.stats is not None:
+            self.stats.add(section, time.perf_counter()-start)
+
+    def toggle_curs(self, mode:str) -> None:
+        '''
+        Toggles the cursor display on or off according to the mode.
+
+        Args:
+            mode (str): Indicates which cursor (line or row).
+        '''
+        # flip flag
+        if mode == 'line':
+            self.line_curs_on = not self.line_curs_on
+        else:
+            self.row_curs_on = not self.row_curs_on
+
+    def current_words(self) -> tuple:
+        '''
+        Returns the line holding the cursor and its word boundaries (see word_boundaries).
+        The boundaries of the lines moved over are kept until those lines are edited (see LineWords),
+        so the next motions on a long line only search the boundaries.
+        '''
+        if self.words is None or self.words.buffer is not self.buffer or self.words.history is not self.history:
+            if self.words is not None:
+                self.words.close()
+            self.words = LineWords(self.buffer, self.history)
+        return self.words.get(self.line_curs_pos)
+
+    # cursor movement functions
+    def move_row_curs(self, delta:int) -> None:
+        '''
+        Moves the row cursor by the specified delta.
+        Initiates user to enter another input if the text is empty.
+
+        Args:
+            delta (int) : The number of positions to move the row cursor (positive: right, negative: left).
+        '''
+        if not self.document_is(''):
+            current_line = self.buffer.get_line(self.line_curs_pos)
+            self.row_curs_pos = max(0, min(len(current_line)-1, self.row_curs_pos+delta))
+
+    def move_line_curs(self, delta:int, usage:str='') -> None:
+        '''
+        Moves the line cursor by the specified delta.
+
+        Args:
+            delta (int) : The number of positions to move the line cursor (positive: downwards, negative: upwards).
+            usage (str) : The usage of this function.
+        '''
+        self.line_curs_pos = max(0, min(self.buffer.line_count()-1, self.line_curs_pos+delta))
+        current_line = self.buffer.get_line(self.line_curs_pos)
+        self.row_curs_pos = min(self.row_curs_pos, len(current_line))
+
+    def move_prev_word(self) -> None:
+        '''
+        Moves the row cursor to the beginning of the previous word (word to the left of the current word).
+        If no word exists in that direction, the cursor remains stationary.
+        '''
+        current_line, indices = self.current_words()    # indices containing spaces in str and endpoints
+        last = len(indices)-1
+
+        i = bisect_left(indices, self.row_curs_pos-1, 1, last)     # first space just before the cursor
+        j = bisect_left(indices, self.row_curs_pos, 1)-1           # space before the word holding the cursor
+        if i < last and indices[i] == self.row_curs_pos-1:     # cursor is at the beginning of a word
+            if indices[i - 1] == 0:     # cursor is just before a word at the beginning of the line
+                self.move_row_curs(-self.row_curs_pos)
+            elif self.row_curs_pos < len(current_line) and current_line[self.row_curs_pos] == ' ':     # cursor is at a space: backtrack past whitespace
+                n = count_space_before(current_line, self.row_curs_pos)
+                self.move_row_curs(-n)
+                j = bisect_left(indices, self.row_curs_pos, 1)-1
+                if 1 <= j < last:
+                    self.move_row_curs(indices[j] - self.row_curs_pos + 1)
+            elif current_line[self.row_curs_pos - 1] == current_line[self.row_curs_pos - 2] == ' ':   # cursor is at beginning of a word with preceding whitespace
+                n = count_space_before(current_line, self.row_curs_pos)
+                j = bisect_left(indices, self.row_curs_pos - n, 0, last)-1
+                if j >= 0:
+                    self.move_row_curs(-self.row_curs_pos if indices[j] == 0 else indices[j] - self.row_curs_pos + 1)
+            else:   # default: move to previous word
+                self.move_row_curs(indices[i - 1] - self.row_curs_pos + 1)
+        elif 1 <= j < last:     # cursor is within a word, move to start of current or previous word
+            self.move_row_curs(indices[j] - self.row_curs_pos + 1)
+        if indices[0] < self.row_curs_pos < indices[1]:  # cursor in first word but not at start
+            self.move_row_curs(-self.row_curs_pos)
+
+    def move_next_word(self) -> None:
+        '''
+        Moves the row cursor to the beginning of the next word (word to the right of the current word).
+        If no word exists in that direction, the row cursor remains stationary.
+        '''
+        current_line, indices = self.current_words()    # indices containing spaces in str and endpoints
+        i = bisect_left(indices, self.row_curs_pos, 1, len(indices)-1)     # first space at or after the cursor
+
+        if indices[-2] < self.row_curs_pos <= indices[-1]: # for words located at the end of the sentence
+            self.move_row_curs(0)
+        elif i < len(indices)-1:
+            if indices[i] == self.row_curs_pos:    # if cursor is at a space
+                n = count_space_after(current_line, self.row_curs_pos)+1
+                if n > 1:   # if the space is followed by an(other) space(s)
+                    self.move_row_curs(n)
+                self.move_row_curs(1)
+            else:   # if cursor is at a word
+                n = count_space_after(current_line, indices[i])
+                self.move_row_curs(indices[i]-self.row_curs_pos+n)
+
+    # text manipulation functions
+    def manipulate_text(self, begin:int, end:int, delta:int, inserted_text='') -> None:
+        '''
+        Modifies the current line by replacing the content between "begin" and "end" with "inserted_text".
+        Moves the cursor according to the delta.
+
+        Args:
+            begin (int), end(int)   : The index where the text manipulation starts and ends.
+            delta (int)             : The distance where the row cursor needs to be moved after manipulating text.
+            inserted_text (str)     : The text that is going to be inserted between "begin" and "end" (default: '').
+        '''
+        # manipulate text
+        current_line = self.buffer.get_line(self.line_curs_pos)
+        current_line = current_line[:begin] + inserted_text + current_line[end:]
+        self.replace_lines(self.line_curs_pos, 1, [current_line])
+
+        # move cursor
+        if self.row_curs_pos == len(current_line):
+            self.move_row_curs(-1)
+        else:
+            if split_count(self.history.last_command())[1] in ['o', 'O'] and delta == 0:
+                delta = -self.row_curs_pos
+            self.move_row_curs(delta)
+
+    def delete_word(self) -> None:
+        '''
+        Deletes a word at or after the cursor position.
+        Moves the cursor to the start of the next word.
+        '''
+        current_line, indices = self.current_words()
+        begin = end = self.row_curs_pos
+        # identify indices with spaces + endpoints, starting at "first"
+        first = 1 if indices[1] == 0 else 0     # the line starts with a space, or is empty
+        last = len(indices)-1
+
+        # determine begin and end indices to slice text
+        i = bisect_left(indices, self.row_curs_pos, first)
+        if i <= last and max(i-1, first) < last:    # if the cursor is in the middle to end of a word
+            i = max(i-1, first)
+            n = count_space_after(current_line, self.row_curs_pos)
+            begin, end = self.row_curs_pos, indices[i+1]+1+n
+            if len(current_line) < end:     # if the cursor is at the last word
+                end = len(current_line)
+
+        if self.row_curs_pos < len(current_line) and current_line[self.row_curs_pos] == ' ':  # if the cursor is at a space
+            n = count_space_after(current_line, self.row_curs_pos)
+            begin, end = self.row_curs_pos, self.row_curs_pos+n
+
+        if self.row_curs_pos == 0:  # if the cursor is at the start and is at a word, words one letter apart are joined
+            i = bisect_left(indices, end+1, first)
+            while i < last and indices[i] == end+1:
+                begin, end = self.row_curs_pos, indices[i]+1
+                i = bisect_left(indices, end+1, i+1)
+
+        # slice text
+        self.replace_lines(self.line_curs_pos, 1, [current_line[:begin]+current_line[end:]])
+        inner = indices[1:-1]   # the boundaries of the rest of the line follow from those of the line
+        kept, moved = bisect_left(inner, begin), bisect_left(inner, end)
+        self.words.replaced(self.line_curs_pos, current_line[:begin]+current_line[end:],
+                            (0, *inner[:kept], *[i-(end-begin) for i in inner[moved:]], len(current_line)-(end-begin)))
+
+        # move cursor
+        at_space = bisect_left(indices, self.row_curs_pos, first)
+        after_word = bisect_left(indices, end, first)
+        if begin == 0:  # for words located at the beginnig
+            self.move_row_curs(-self.row_curs_pos)
+        elif at_space <= last and indices[at_space] == self.row_curs_pos and at_space <= after_word:   # if cursor is at a space
+            self.move_row_curs(0)
+        elif after_word <= last:    # for words located in the middle of the sentence
+            self.move_row_curs(begin-self.row_curs_pos)
+
+    def copy(self, count:int=1) -> None:
+        '''
+        Copy the current line, or a number of lines from the current line, to the register of the command.
+        Do nothing if the current line is empty.
+
+        Args:
+            count (int) : The number of lines to copy (default: 1).
+        '''
+        if count >= BLOCK_SIZE:
+            self.store_register(self.buffer.snapshot(self.line_curs_pos, self.line_curs_pos+count))
+            return
+        lines = list(self.buffer.lines(self.line_curs_pos, self.line_curs_pos+count))
+        if count > 1 or lines[0]:
+            self.store_register(lines)
+
+    def copy_range(self, line_range:str, register:str='') -> None:
+        '''
+        Copy the lines of a range to a register.
+
+        Args:
+            line_range (str)    : The range of lines, as accepted by parse_range.
+            register (str)      : The name of the register, a to z (default: the unnamed register).
+        '''
+        register = register.strip() or '"'
+        try:
+            start, stop = parse_range(line_range, self.line_curs_pos, self.buffer.line_count())
+            if len(register) != 1 or register not in '"'+string.ascii_lowercase:
+                raise ValueError(f'Invalid register: {register}')
+        except ValueError as error:
+            self.message(error)
+            return
+        self.register = register
+        self.store_register(self.buffer.snapshot(start, stop) if stop-start >= BLOCK_SIZE else list(self.buffer.lines(start, stop)))
+        self.message(f'{stop-start} lines copied')
+
+    def store_register(self, lines:list) -> None:
+        '''
+        Stores lines in the register of the command, which also becomes the content of the unnamed register.
+        The lines are the strings held by the document, shared rather than copied; a large range
+        is stored as a snapshot of the document, so the lines not read yet are not read to be copied.
+
+        Args:
+            lines (list)    : The copied lines, or a LineBuffer holding them.
+        '''
+        self.registers = {**self.registers, '"': lines, self.register: lines}
+
+    def paste(self, delta:int, count:int=1) -> None:
+        '''
+        Pastes the lines of the register of the command by the specified delta, in a single edit.
+
+        Args:
+            delta (int) : The position to paste the copied lines.
+                          (1: below the current line, -1: above the current line).
+            count (int) : The number of copies, pasted at once (default: 1).
+        '''
+        lines = self.registers.get(self.register)
+        if lines is None:
+            self.message(f'Nothing in register {self.register}')
+            return
+        index = self.line_curs_pos+1 if delta == 1 else self.line_curs_pos
+        if isinstance(lines, LineBuffer):   # the copies share the blocks of the register
+            self.replace_lines(index, 0, LineBuffer.from_blocks([block for _ in range(count) for block in lines.blocks()]))
+        else:
+            self.replace_lines(index, 0, lines*count)
+        # the cursor ends on the last copy below the line, or on the first copy above it
+        self.line_curs_pos = index+len(lines)*(count-1) if delta == 1 else index
+
+    def delete_line(self, count:int=1) -> None:
+        '''
+        Delete the current line.
+        Adjust the line and row cursors accordingly.
+        A count deletes the lines at once, as deleting one line that many times would:
+        downwards from the current line, then upwards once the last line is deleted.
+
+        Args:
+            count (int) : The number of lines to delete (default: 1).
+        '''
+        n = self.buffer.line_count()
+        if count >= n:
+            self.replace_lines(0, n, [''])   # the document always keeps at least one line
+            self.line_curs_pos = 0
+            self.move_line_curs(0)
+        elif self.line_curs_pos+count < n:   # the lines below take the place of the deleted ones
+            shortest = min(len(line) for line in self.buffer.lines(self.line_curs_pos+1, self.line_curs_pos+count+1))
+            self.replace_lines(self.line_curs_pos, count, [])
+            self.row_curs_pos = min(self.row_curs_pos, shortest)
+        else:   # the last lines are deleted and the cursor moves up
+            first = n-count
+            shortest = min(len(line) for index, line in enumerate(self.buffer.lines(first-1, n), first-1) if index != self.line_curs_pos)
+            self.replace_lines(first, count, [])
+            self.line_curs_pos = first-1
+            self.row_curs_pos = min(self.row_curs_pos, shortest)
+
+    def delete_range(self, line_range:str, argument:str='') -> None:
+        '''
+        Deletes the lines of a range in a single edit.
+        The lines are moved out of the document without being read, so cutting a large part of a
+        large file takes as little memory as deleting one line. The line cursor moves to the line
+        that follows the range, or to the last line.
+
+        Args:
+            line_range (str)    : The range of lines, as accepted by parse_range.
+            argument (str)      : Anything typed after the command, which must be empty.
+        '''
+        if argument:
+            self.message('Usage: :[range]d')
+            return
+        try:
+            start, stop = parse_range(line_range, self.line_curs_pos, self.buffer.line_count())
+        except ValueError as error:
+            self.message(error)
+            return
+        if stop-start == self.buffer.line_count():
+            self.replace_lines(0, stop, [''])   # the document always keeps at least one line
+        else:
+            self.replace_lines(start, stop-start, [])
+        self.line_curs_pos = start
+        self.move_line_curs(0)
+        self.message(f'{stop-start} lines deleted')
+
+    def insert_new_line(self, delta:int, count:int=1) -> None:
+        '''
+        Inserts new lines by the specified delta, in a single edit.
+        The first "o" or "O" on an empty document only takes its line as the new one.
+
+        Args:
+            delta (int)     : The position to insert the new lines.
+                              (1: below the current line, -1: above the current line).
+            count (int)     : The number of new lines, as typing the command that many times (default: 1).
+        '''
+        if self.document_is('') and split_count(self.history.last_command())[1] not in ['o', 'O']:
+            count -= 1
+        if count and delta == 1:
+            self.replace_lines(self.line_curs_pos+1, 0, ['']*count)
+            self.move_line_curs(count)
+        else:
+            if count:
+                self.replace_lines(self.line_curs_pos, 0, ['']*count)
+            self.move_line_curs(0)
+
+    # history functions
+    def undo_prev(self) -> None:
+        '''
+        Undoes the previous command by reverting the edits it made.
+        If there is no command prior, nothing happens.
+        '''
+        start = time.perf_counter()
+        left = self.history.undo_stack[-1].after if self.history.undo_stack else None
+        state = self.history.undo(self.buffer)
+        self.account('history', start)
+        self.report_journal()
+        if state:
+            self.restore_state(state, left)
+            if not self.document_is(''):
+                self.show()
+
+    def redo_next(self) -> None:
+        '''
+        Redoes the previously undone command by re-applying the edits it made.
+        If no command has been undone, nothing happens.
+        '''
+        start = time.perf_counter()
+        left = self.history.redo_stack[-1].before if self.history.redo_stack else None
+        state = self.history.redo(self.buffer)
+        self.account('history', start)
+        self.report_journal()
+        if state:
+            self.restore_state(state, left)
+            if not self.document_is(''):
+                self.show()
+
+    def repeat_last_command(self) -> None:
+        '''
+        Repeats the last executed command.
+        If the last command cannot be repeated, the content is shown instead.
+        '''
+        last_command = self.history.last_command()
+        if is_repeatable(last_command):
+            self.run(last_command)
+        else:
+            self.show()
+
+    # search functions
+    def search(self, pattern:str='', delta:int=1) -> None:
+        '''
+        Moves the cursors to the next or previous match of a regular expression, wrapping around the document.
+        The lines are scanned one block at a time from the cursor, so the document is never joined into one string.
+
+        Args:
+            pattern (str)   : The regular expression (default: the last pattern searched for).
+            delta (int)     : The direction of the search (1: forwards, -1: backwards).
+        '''
+        pattern = pattern or self.search_pattern
+        if not pattern:
+            self.message('No previous pattern')
+            return
+        try:
+            regex = compile_pattern(pattern)
+        except re.error as error:
+            self.message(f'Invalid pattern: {error}')
+            return
+        self.search_pattern = pattern
+        line_count = self.buffer.line_count()
+        if delta == 1:  # after the cursor, the lines below, then from the top back to the cursor
+            match = regex.search(self.buffer.get_line(self.line_curs_pos), self.row_curs_pos+1)
+            if match:
+                self.row_curs_pos = match.start()
+                return
+            for start, stop in [(self.line_curs_pos+1, line_count), (0, self.line_curs_pos+1)]:
+                for index, line in enumerate(self.buffer.lines(start, stop), start):
+                    match = regex.search(line)
+                    if match:
+                        self.line_curs_pos, self.row_curs_pos = index, match.start()
+                        return
+        else:   # before the cursor, the lines above, then from the bottom back to the cursor
+            line = self.buffer.get_line(self.line_curs_pos)
+            matches = [match.start() for match in regex.finditer(line) if match.start() < self.row_curs_pos]
+            if matches:
+                self.row_curs_pos = matches[-1]
+                return
+            for start, stop in [(0, self.line_curs_pos), (self.line_curs_pos, line_count)]:
+                for block_stop in range(stop, start, -BLOCK_SIZE):
+                    block_start = max(start, block_stop-BLOCK_SIZE)
+                    lines = list(self.buffer.lines(block_start, block_stop))
+                    for index in range(len(lines)-1, -1, -1):
+                        matches = [match.start() for match in regex.finditer(lines[index])]
+                        if matches:
+                            self.line_curs_pos, self.row_curs_pos = block_start+index, matches[-1]
+                            return
+        self.message(f'Pattern not found: {pattern}')
+
+    def substitute(self, line_range:str, substitution:str) -> None:
+        '''
+        Replaces the matches of a regular expression in a range of lines.
+        A replacement holding line breaks splits its line into several lines, as in :s/,/\\n/g.
+        The lines are read and rewritten a few blocks at a time, each group of blocks in a single edit,
+        and the whole substitution is undone at once. The replaced lines of a large group are packed
+        and the edit keeps the original lines without reading them again, so memory stays bounded.
+
+        Args:
+            line_range (str)    : The range of lines, as accepted by parse_range.
+            substitution (str)  : The pattern, replacement and flags ("g": every match in a line, "i": ignore case),
+                                  as in "/pattern/replacement/g".
+        '''
+        if not substitution:
+            self.message('Usage: :[range]s/<pattern>/<replacement>/[gi]')
+            return
+        pattern, replacement, flags = split_substitution(substitution)
+        try:
+            start, stop = parse_range(line_range, self.line_curs_pos, self.buffer.line_count())
+            regex = compile_pattern(pattern or self.search_pattern, re.IGNORECASE if 'i' in flags else 0)
+        except (ValueError, re.error) as error:
+            self.message(error)
+            return
+        replaced = last = added = 0     # added: lines made by line breaks so far, which move the next blocks down
+        try:
+            for offset in range(start, stop, PACK_SIZE):
+                block_start = offset+added
+                lines = list(self.buffer.lines(block_start, block_start+min(PACK_SIZE, stop-offset)))
+                changed = []
+                for index, line in enumerate(lines):
+                    new_line, count = regex.subn(replacement, line, count=0 if 'g' in flags else 1)
+                    if count:
+                        lines[index] = new_line
+                        changed.append(index)
+                        replaced += count
+                if changed:     # only the lines between the first and the last change are rewritten
+                    new_lines = [part for line in lines[changed[0]:changed[-1]+1] for part in line.split('\n')]
+                    self.replace_lines(block_start+changed[0], changed[-1]-changed[0]+1, new_lines)
+                    last = block_start+changed[0]+len(new_lines)-1
+                    added += len(new_lines)-(changed[-1]-changed[0]+1)
+        except (re.error, IndexError) as error:    # invalid replacement, found at the first match
+            self.message(f'Invalid replacement: {error}')
+            return
+        if not replaced:
+            self.message(f'Pattern not found: {pattern or self.search_pattern}')
+            return
+        self.search_pattern = pattern or self.search_pattern
+        self.line_curs_pos, self.row_curs_pos = last, 0
+        self.message(f'{replaced} substitutions')
+
+    # file functions
+    def open_document(self, path:str='', force:bool=False) -> None:
+        '''
+        Opens a file in a new document, whose content is read lazily, and edits it.
+        A path that does not exist yet starts an empty document that is saved there.
+        A file that is already open in another document is switched to instead. The document
+        being edited is replaced when it is empty without a file, or when it is the same file,
+        which is read again: its history is then discarded. The same file is only read again
+        over changes that were not written when forced, and its journal is kept either way,
+        so the discarded changes can still be recovered.
+
+        Args:
+            path (str)      : The path of the file (default: the file being edited, when forced).
+            force (bool)    : Whether the unsaved changes of the file being edited may be discarded (default: False).
+        '''
+        path = path or (self.file_path if force else '')
+        if not path:
+            self.message('No file name')
+            return
+        from fileio import open_file
+        from journal import Journal
+        for number, document in enumerate(self.documents):
+            if number != self.current and document.file_path and os.path.abspath(document.file_path) == os.path.abspath(path):
+                self.switch_document(number)
+                return
+        same_file = self.file_path and os.path.abspath(self.file_path) == os.path.abspath(path)
+        if same_file and not force and self.buffer.version != self.written_version:
+            self.message(f'No write since last change, use ":e! {path}" to discard the changes')
+            return
+        try:
+            buffer = open_file(path) if os.path.exists(path) else LineBuffer()
+        except OSError as error:
+            self.message(error)
+            return
+        if same_file or not self.file_path and self.document_is(''):
+            if self.history.journal:
+                self.history.journal.close(remove=False)
+        else:   # the document being edited is kept aside, with its highlighter
+            self.documents[self.current] = self.save_document()
+            self.documents.append(None)
+            self.current = len(self.documents)-1
+            self.highlighter = None
+        self.buffer = buffer
+        self.file_path = path
+        self.written_version = buffer.version
+        journal = Journal(path, self.buffer) if self.journaled else None
+        self.history = History(history_depth, history_memory, journal)
+        self.row_curs_pos = self.line_curs_pos = self.screen.top = 0
+        self.message(f'"{path}" {self.buffer.line_count()} lines')
+        if journal and journal.exists():
+            self.message(f'Unsaved changes found in "{journal.journal_path}", use ":recover" to restore them')
+
+    def write_document(self, line_range:str='', path:str='') -> None:
+        '''
+        Writes the document, or the lines of a range, to a file.
+        Without a path, the document is written to the file it was opened from.
+
+        Args:
+            line_range (str)    : The range of lines, as accepted by parse_range (default: the whole document).
+            path (str)          : The path of the file (default: the opened file).
+        '''
+        written = self.prepare_write(line_range, path)
+        if not written:
+            return
+        path, buffer = written
+        from fileio import save_file
+        try:
+            save_file(buffer, path)
+        except OSError as error:
+            self.message(error)
+            return
+        if not line_range:
+            self.document_written(path)
+        self.message(f'"{path}" {buffer.line_count()} lines written')
+
+    def prepare_write(self, line_range:str='', path:str=''):
+        '''
+        Returns the path to write to and the lines to write: the document itself, or a snapshot
+        of the lines of a range, streamed to the file block by block without being read at once.
+        Returns None, with a message, if nothing can be written.
+
+        Args:
+            line_range (str)    : The range of lines, as accepted by parse_range (default: the whole document).
+            path (str)          : The path of the file (default: the opened file).
+        '''
+        path = path.strip() or self.file_path
+        if not path:
+            self.message('No file name')
+            return None
+        if not line_range:
+            return path, self.buffer
+        try:
+            start, stop = parse_range(line_range, self.line_curs_pos, self.buffer.line_count())
+        except ValueError as error:
+            self.message(error)
+            return None
+        if self.file_path and os.path.abspath(path) == os.path.abspath(self.file_path):
+            self.message('Cannot write part of the document over its own file')
+            return None
+        return path, self.buffer.snapshot(start, stop)
+
+    def document_written(self, path:str, position:tuple=None, version:int=None) -> None:
+        '''
+        Takes note that the document was written to a file: a document without a file
+        now belongs to it, and the journal of a document written to its own file starts again.
+
+        Args:
+            path (str)          : The path of the file.
+            position (tuple)    : The position of the journal when the written snapshot was taken
+                                  (default: the document was written as it is now).
+            version (int)       : The version of the written snapshot (default: the version of the document now).
+        '''
+        if not self.file_path:
+            self.file_path = path
+            if self.journaled:
+                from journal import Journal
+                self.history.journal = Journal(path, self.buffer)
+        elif os.path.abspath(path) != os.path.abspath(self.file_path):     # a copy: the file itself was not written
+            return
+        elif self.history.journal:
+            try:
+                self.history.journal.rebase(position)
+            except OSError as error:
+                self.history.drop_journal(error)
+                self.report_journal()
+        self.written_version = self.buffer.version if version is None else version
+
+    def recover_document(self) -> None:
+        '''
+        Restores the document as it was when an earlier editor of the same file crashed,
+        by replaying its journal over the file or the last checkpoint.
+        The history of the document is discarded.
+        '''
+        journal = self.history.journal
+        if not journal or not journal.exists():
+            self.message('No journal to recover')
+            return
+        try:
+            self.buffer, cursor = journal.recover()
+        except (OSError, ValueError) as error:
+            self.message(error)
+            return
+        self.history = History(history_depth, history_memory, journal)
+        self.written_version = -1   # the recovered changes are not in the file
+        self.restore_state(cursor+(self.registers,))
+        self.message(f'"{self.file_path}" {self.buffer.line_count()} lines, {journal.records} journaled commands replayed')
+
+    def close(self) -> None:
+        '''
+        Closes the journals of every document and removes them, once the editor quits,
+        and stops tracing memory for the statistics.
+        '''
+        if self.stats is not None:
+            self.stats.close()
+        self.documents[self.current] = self.save_document()
+        for document in self.documents:
+            if document.history.journal:
+                document.history.journal.close()
+
+    # buffer list functions
+    def save_document(self) -> Document:
+        '''
+        Returns the document being edited, as it is left.
+        '''
+        return Document(self.buffer, self.history, self.file_path, self.row_curs_pos, self.line_curs_pos, self.screen.top,
+                        self.written_version, self.highlighter)
+
+    def switch_document(self, number:int) -> None:
+        '''
+        Edits another open document where it was left and shows it.
+        Only the references to the documents are exchanged, so switching takes the same time for any document.
+
+        Args:
+            number (int)    : The number of the document, from 0.
+        '''
+        self.documents[self.current] = self.save_document()
+        self.current = number % len(self.documents)
+        self.buffer, self.history, self.file_path, self.row_curs_pos, self.line_curs_pos, self.screen.top, \
+            self.written_version, self.highlighter = self.documents[self.current]
+        self.show()
+
+    def list_documents(self) -> None:
+        '''
+        Shows the open documents: their number, their file, and the line of the cursor.
+        The document being edited is marked with %.
+        '''
+        self.documents[self.current] = self.save_document()
+        for number, document in enumerate(self.documents):
+            name = f'"{document.file_path}"' if document.file_path else '[No Name]'
+            self.message(f'{number+1:>3} {"%" if number == self.current else " "} {name:<30} '
+                         f'line {document.line_curs_pos+1} of {document.buffer.line_count()}')
+
+    # highlighting functions
+    def set_syntax(self, argument:str='') -> None:
+        '''
+        Turns syntax highlighting on or off, and shows the document as it is now displayed.
+        Without an argument, shows the language the document is highlighted in.
+
+        Args:
+            argument (str)  : 'on' to highlight files by their extension, 'off' to stop, or the name of a language.
+        '''
+        from highlight import LANGUAGES
+        if argument in ['on', 'off'] or argument in LANGUAGES:
+            self.syntax = '' if argument == 'off' else argument
+            if not self.syntax:     # the highlighters of every document stop following their edits
+                self.documents[self.current] = self.save_document()
+                for number, document in enumerate(self.documents):
+                    if document.highlighter:
+                        document.highlighter.close()
+                        self.documents[number] = document._replace(highlighter=None)
+                self.highlighter = None
+            self.show()
+        elif argument:
+            self.message(f'Usage: :syntax [on|off|{"|".join(LANGUAGES)}]')
+            return
+        highlighter = self.current_highlighter()
+        if not highlighter:
+            self.message('Highlighting off')
+        else:
+            self.message(f'Highlighting {highlighter.language or "on, no language for this file"}')
+
+    # statistics functions
+    def statistics(self, argument:str='') -> None:
+        '''
+        Shows, records or exports the cost of every command.
+        Without an argument, shows the cost of the commands recorded so far.
+
+        Args:
+            argument (str)  : 'on' to start recording, 'mem' to also trace the memory allocated by the commands,
+                              'profile' to also profile the commands with cProfile, 'off' to stop, 'reset' to forget the records,
+                              'csv <path>' or 'prof <path>' to export the records or the profile.
+        '''
+        action, _, path = argument.partition(' ')
+        path = path.strip()
+        if action in ['on', 'mem', 'profile']:
+            from stats import CommandStats
+            if self.stats is not None:
+                self.stats.close()
+            self.stats = CommandStats(profile=action == 'profile', memory=action == 'mem')
+            self.message('Statistics on, tracing memory' if action == 'mem' else 'Statistics on')
+        elif self.stats is None:
+            self.message('Statistics are off, use ":stats on"')
+        elif action == 'off':
+            self.stats.close()
+            self.stats = None
+            self.message('Statistics off')
+        elif action == 'reset':
+            self.stats.records.clear()
+        elif action in ['csv', 'prof'] and path:
+            try:
+                if action == 'csv':
+                    self.stats.export_csv(path)
+                else:
+                    self.stats.export_profile(path)
+            except (OSError, ValueError) as error:
+                self.message(error)
+                return
+            self.message(f'"{path}" written')
+        elif not action:
+            self.message(self.stats.summary())
+        else:
+            self.message('Usage: :stats [on|mem|profile|off|reset|csv <path>|prof <path>]')
+
+# commands that take their count as an argument and apply it as a single edit
+batched_commands = ['dd', 'yy', 'p', 'P', 'o', 'O']
+
+# command line commands taking a range of lines, as in :%s, :3,10y or :10,$w part.txt
+ranged_commands = [':s', ':y', ':d', ':w']
+
+# command table: built once and shared by every session, each command runs on the session given to it
+options = {'?': lambda session: session.message(help_message),
+           '.': lambda session: session.toggle_curs('row'),
+           ';': lambda session: session.toggle_curs('line'),
+           'h': lambda session: session.move_row_curs(-1),
+           'j': lambda session: session.move_line_curs(-1, 'move'),
+           'k': lambda session: session.move_line_curs(1, 'move'),
+           'l': lambda session: session.move_row_curs(1),
+           '^': lambda session: session.move_row_curs(-session.row_curs_pos-1),
+           '$': lambda session: session.move_row_curs(len(session.buffer.get_line(session.line_curs_pos))-session.row_curs_pos),
+           'w': Session.move_next_word,
+           'b': Session.move_prev_word,
+           'i': lambda session, inserted_text: session.manipulate_text(session.row_curs_pos, session.row_curs_pos, 0, inserted_text),
+           'a': lambda session, inserted_text: session.manipulate_text(session.row_curs_pos+1, session.row_curs_pos+1, len(session.buffer.get_line(session.line_curs_pos)+inserted_text)-1, inserted_text),
+           'x': lambda session: session.manipulate_text(session.row_curs_pos, session.row_curs_pos+1, -1 if session.row_curs_pos > len(session.buffer.get_line(session.line_curs_pos)) else 0),
+           'dw': Session.delete_word,
+           'yy': Session.copy,
+           'p': lambda session, count=1: session.paste(1, count),
+           'P': lambda session, count=1: session.paste(-1, count),
+           'dd': Session.delete_line,
+           'o': lambda session, count=1: session.insert_new_line(1, count),
+           'O': lambda session, count=1: session.insert_new_line(-1, count),
+           '/': Session.search,
+           'n': lambda session: session.search(session.search_pattern, 1),
+           'N': lambda session: session.search(session.search_pattern, -1),
+           ':s': Session.substitute,
+           ':y': Session.copy_range,
+           ':d': Session.delete_range,
+           'u': Session.undo_prev,
+           'U': Session.redo_next,
+           'r': Session.repeat_last_command,
+           's': lambda session: session.message(session.render()),
+           ':e': Session.open_document,
+           ':e!': lambda session, path='': session.open_document(path, force=True),
+           ':w': Session.write_document,
+           ':recover': Session.recover_document,
+           ':bn': lambda session: session.switch_document(session.current+1),
+           ':bp': lambda session: session.switch_document(session.current-1),
+           ':ls': Session.list_documents,
+           ':stats': Session.statistics,
+           ':syntax': Session.set_syntax}
@@ -0,0 +1,143 @@
+'''
+Command Statistics
+
+Opt-in instrumentation of the commands run by a session. While it is on, every
+command records its wall time, the time spent rendering and recording history,
+the memory blocks it left allocated, the size of the document, and how many times
+the whole document was read. Tracing the memory allocations slows every command
+down, so the peak memory of a command is only recorded when it is asked for, with
+tracemalloc started for as long as the statistics are kept. The records can be
+summarized per command, exported as CSV, and the commands can also be profiled
+with cProfile, so a slow editor shows right away which part of which command is
+to blame.
+'''
+
+# import library
+import cProfile
+import csv
+import sys
+import time
+import tracemalloc
+from collections import deque, namedtuple
+
+# what one command cost
+Record = namedtuple('Record', ['command', 'seconds', 'render_seconds', 'history_seconds',
+                               'allocated_blocks', 'peak_bytes', 'lines', 'passes'])
+
+class CommandStats:
+    '''
+    Records the cost of every command run by a session.
+
+    Args:
+        profile (bool)      : Whether the commands are also profiled with cProfile (default: False).
+        memory (bool)       : Whether the memory allocated by the commands is traced with tracemalloc (default: False).
+        max_records (int)   : The maximum number of records kept, the oldest are forgotten (default: 100000).
+    '''
+    def __init__(self, profile:bool=False, memory:bool=False, max_records:int=100000):
+        self.records = deque(maxlen=max_records)
+        self.profiler = cProfile.Profile() if profile else None
+        self.tracing = memory and not tracemalloc.is_tracing()     # whether tracemalloc was started here
+        if self.tracing:
+            tracemalloc.start()
+        self.active = False     # whether a command is being measured
+        self._sections = {}     # seconds spent in the sections of the measured command
+
+    def close(self) -> None:
+        '''
+        Stops tracing the memory allocations, if they were traced for these statistics.
+        '''
+        if self.tracing:
+            tracemalloc.stop()
+            self.tracing = False
+
+    def add(self, section:str, seconds:float) -> None:
+        '''
+        Adds the time spent in a section (such as 'render' or 'history') to the measured command.
+
+        Args:
+            section (str)       : The name of the section.
+            seconds (float)     : The time spent in the section.
+        '''
+        if self.active:
+            self._sections[section] = self._sections.get(section, 0.0)+seconds
+
+    def measure(self, session, user_input:str) -> bool:
+        '''
+        Runs a command on a session and records what it cost.
+        Returns what the command returned.
+
+        Args:
+            session (Session)   : The session running the command.
+            user_input (str)    : The command, as typed at the prompt.
+        '''
+        buffer, passes = session.buffer, session.buffer.passes
+        self._sections = {}
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            traced = tracemalloc.get_traced_memory()[0]
+        blocks = sys.getallocatedblocks()
+        self.active = True
+        if self.profiler:
+            self.profiler.enable()
+        start = time.perf_counter()
+        try:
+            return session.execute(user_input)
+        finally:
+            seconds = time.perf_counter()-start
+            if self.profiler:
+                self.profiler.disable()
+            self.active = False
+            if session.buffer is not buffer:    # another document was opened
+                passes = 0
+            self.records.append(Record(user_input, seconds, self._sections.get('render', 0.0),
+                                       self._sections.get('history', 0.0), sys.getallocatedblocks()-blocks,
+                                       tracemalloc.get_traced_memory()[1]-traced if tracing else None,
+                                       session.buffer.line_count(), session.buffer.passes-passes))
+
+    def summary(self) -> str:
+        '''
+        Returns a table of the cost of every command, grouped by the command without its argument.
+        Blocks are the mean net number of memory blocks a command left allocated, which is negative
+        when it freed more than it allocated; memory peaks are only known when tracemalloc is tracing.
+        '''
+        groups = {}
+        for record in self.records:
+            command = record.command[:1] if record.command[:1] in ['i', 'a'] else record.command.split(' ')[0]
+            groups.setdefault(command, []).append(record)
+        rows = [f'{"command":<10}{"count":>7}{"total ms":>11}{"mean ms":>10}{"max ms":>10}'
+                f'{"render ms":>11}{"history ms":>12}{"blocks":>9}{"peak KB":>9}{"lines":>11}{"passes":>8}']
+        for command, records in sorted(groups.items(), key=lambda group: -sum(record.seconds for record in group[1])):
+            total = sum(record.seconds for record in records)
+            peaks = [record.peak_bytes for record in records if record.peak_bytes is not None]
+            rows.append(f'{command:<10}{len(records):>7}{total*1000:>11.2f}{total*1000/len(records):>10.3f}'
+                        f'{max(record.seconds for record in records)*1000:>10.3f}'
+                        f'{sum(record.render_seconds for record in records)*1000:>11.2f}'
+                        f'{sum(record.history_seconds for record in records)*1000:>12.2f}'
+                        f'{sum(record.allocated_blocks for record in records)//len(records):>9}'
+                        f'{max(peaks)//1024 if peaks else "-":>9}'
+                        f'{records[-1].lines:>11}{sum(record.passes for record in records):>8}')
+        return '\n'.join(rows)
+
+    def export_csv(self, path:str) -> None:
+        '''
+        Writes every record to a CSV file, one command per row.
+
+        Args:
+            path (str)  : The path of the file.
+        '''
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(Record._fields)
+            writer.writerows(self.records)
+
+    def export_profile(self, path:str) -> None:
+        '''
+        Writes the profile of the commands to a file that pstats or snakeviz can read.
+
+        Args:
+            path (str)  : The path of the file.
+        '''
+        if not self.profiler:
+            raise ValueError('Profiling is off, use ":stats profile"')
+        self.profiler.dump_stats(path)